@@ -1,7 +1,54 @@
+import os
 from argparse import ArgumentParser
 from typing import Literal, NamedTuple, Optional
 
 
+class Args(NamedTuple):
+    """
+    Class to hold the arguments passed to the program and give them a type.
+    """
+
+    mode: Literal[
+        "capture",
+        "process",
+        "train",
+        "compare",
+        "benchmark",
+        "serve",
+        "watch",
+        "calibrate",
+        "generate",
+        "inspect",
+        "burst",
+    ]
+    log: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+    image_save_file: Optional[str]
+    read_image: Optional[str]
+    json_file: Optional[str]
+    template_file: Optional[str]
+    debug_images: Literal["off", "sampled", "always"]
+    debug_every: int
+    debug_dir: str
+    workers: int
+    repeat: int
+    socket: Optional[str]
+    queue_size: int
+    station_file: Optional[str]
+    roi: Optional[str]
+    timings_file: Optional[str]
+    pieces: int
+    size: tuple[int, int]
+    holes: Optional[list[int]]
+    rotation: float
+    noise: float
+    missing: int
+    extra: int
+    seed: int
+    camera: bool
+    frames: Optional[int]
+    wait: bool
+
+
 class ArgsParser(ArgumentParser):
     """Argument parser for the Python program."""
 
@@ -14,27 +61,43 @@ class ArgsParser(ArgumentParser):
         self.add_argument(
             "mode",
             help="Mode to run the script in.",
-            choices=["capture", "process", "train", "compare"],
+            choices=[
+                "capture",
+                "process",
+                "train",
+                "compare",
+                "benchmark",
+                "serve",
+                "watch",
+                "calibrate",
+                "generate",
+                "inspect",
+                "burst",
+            ],
         )
         self.add_argument(
             "-s",
             "--image_save_file",
-            help="File to save the image to (capture|compare).",
+            help="File to save the image to (capture|compare|generate|inspect|burst),"
+            + " or the directory to save the error images to (watch).",
             type=str,
             required=False,
         )
         self.add_argument(
             "-r",
             "--read_image",
-            help="Path to image that will be read and processed "
-            + "(process|compare).",
+            help="Path to image that will be read and processed, or a directory or glob"
+            + " of images to process in batch, or the folder to watch, or the"
+            + " calibration image, or the image to inspect instead of capturing one"
+            + " (process|compare|benchmark|watch|calibrate|inspect).",
             type=str,
         )
         self.add_argument(
             "-j",
             "--json_file",
             help="Path and only name of the to JSON file that will be read or written,"
-            + " without the .json extension (process|compare|train).",
+            + " without the .json extension, or the output directory in batch"
+            + " (process|compare|train|watch|inspect|burst).",
             type=str,
         )
         self.add_argument(
@@ -48,30 +111,180 @@ class ArgsParser(ArgumentParser):
             "-t",
             "--template",
             help="Path to the template json that will be used for template matching"
-            + " without the .json extension (compare|train).",
+            + " without the .json extension, also drops the contours that can not be"
+            + " one of its holes"
+            + " (process|compare|train|watch|inspect|benchmark|burst).",
             type=str,
         )
+        self.add_argument(
+            "-d",
+            "--debug_images",
+            help="When to save the intermediate images of the processing, sampled saves"
+            + " one every --debug_every pieces (process|compare).",
+            choices=["off", "sampled", "always"],
+            default="off",
+        )
+        self.add_argument(
+            "--debug_every",
+            help="Interval in pieces between saved debug images when sampled.",
+            type=int,
+            default=10,
+        )
+        self.add_argument(
+            "--debug_dir",
+            help="Directory to save the debug images to.",
+            type=str,
+            default="./images/output",
+        )
+        self.add_argument(
+            "-w",
+            "--workers",
+            help="Number of worker processes (batch process|burst).",
+            type=int,
+            default=os.cpu_count() or 1,
+        )
+        self.add_argument(
+            "--repeat",
+            help="Number of times each stage is timed, without an image the whole"
+            + " pipeline is timed on synthetic plates (benchmark).",
+            type=int,
+            default=5,
+        )
+        self.add_argument(
+            "--socket",
+            help="UNIX socket to listen for requests on, reads them from stdin if not"
+            + " given (serve).",
+            type=str,
+        )
+        self.add_argument(
+            "--queue_size",
+            help="Maximum number of images waiting to be processed (watch).",
+            type=int,
+            default=16,
+        )
+        self.add_argument(
+            "--station",
+            help="Path to the station JSON with the ROI of the images, written by the"
+            + " calibrate command.",
+            type=str,
+        )
+        self.add_argument(
+            "--roi",
+            help="Region of the images the piece is in as x,y,width,height, overrides"
+            + " the one of the station.",
+            type=str,
+        )
+        self.add_argument(
+            "--timings",
+            help="JSON lines file to write the time of each stage of every piece to,"
+            + " summarised to <timings>_summary.json when the program finishes.",
+            type=str,
+        )
+        self.add_argument(
+            "--pieces",
+            help="Number of plates written as <name>_01.png and on (generate).",
+            type=int,
+            default=1,
+        )
+        self.add_argument(
+            "--size",
+            help="Width and height of the plates as WIDTHxHEIGHT (generate).",
+            type=str,
+            default="7600x6400",
+        )
+        self.add_argument(
+            "--holes",
+            help="Number of holes of the plates, or the hole counts timed"
+            + " (generate|benchmark).",
+            type=int,
+            nargs="+",
+        )
+        self.add_argument(
+            "--rotation",
+            help="Rotation of the plates in degrees (generate).",
+            type=float,
+            default=7.0,
+        )
+        self.add_argument(
+            "--noise",
+            help="Standard deviation of the noise added to the plates (generate).",
+            type=float,
+            default=0.0,
+        )
+        self.add_argument(
+            "--missing",
+            help="Number of holes left out of each plate (generate).",
+            type=int,
+            default=0,
+        )
+        self.add_argument(
+            "--extra",
+            help="Number of unexpected holes added to each plate (generate).",
+            type=int,
+            default=0,
+        )
+        self.add_argument(
+            "--seed",
+            help="Seed of the first plate, each plate uses the next (generate).",
+            type=int,
+            default=0,
+        )
+        self.add_argument(
+            "--camera",
+            help="Time the frames of the camera processed in memory, set"
+            + " CAMERA_BACKEND=virtual to replay images without one (benchmark).",
+            action="store_true",
+        )
+        self.add_argument(
+            "--frames",
+            help="Number of frames of the camera processed, 100 by default (benchmark),"
+            + " or grabbed, 10 by default and the only count with -t (burst).",
+            type=int,
+        )
+        self.add_argument(
+            "--wait",
+            help="Wait for the image to be written before returning, otherwise it is"
+            + " written in the background (capture).",
+            action="store_true",
+        )
 
-    def parse_args(self):
-        class _Args(NamedTuple):
-            """
-            Class to hold the arguments passed to the program and give them a type.
-            """
-
-            mode: Literal["capture", "process", "train", "compare"]
-            log: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-            image_save_file: Optional[str]
-            read_image: Optional[str]
-            json_file: Optional[str]
-            template_file: Optional[str]
-
+    def parse_args(self) -> Args:
         """Parse the arguments passed to the program."""
         args = super().parse_args()
-        return _Args(
+        return Args(
             mode=args.mode,
             log=args.log,
             image_save_file=args.image_save_file,
             read_image=args.read_image,
             json_file=args.json_file,
             template_file=args.template,
+            debug_images=args.debug_images,
+            debug_every=args.debug_every,
+            debug_dir=args.debug_dir,
+            workers=args.workers,
+            repeat=args.repeat,
+            socket=args.socket,
+            queue_size=args.queue_size,
+            station_file=args.station,
+            roi=args.roi,
+            timings_file=args.timings,
+            pieces=args.pieces,
+            size=self.__parse_size(args.size),
+            holes=args.holes,
+            rotation=args.rotation,
+            noise=args.noise,
+            missing=args.missing,
+            extra=args.extra,
+            seed=args.seed,
+            camera=args.camera,
+            frames=args.frames,
+            wait=args.wait,
         )
+
+    def __parse_size(self, size: str) -> tuple[int, int]:
+        """Parse a WIDTHxHEIGHT size."""
+        try:
+            width, height = [int(value) for value in size.lower().split("x")]
+        except ValueError:
+            self.error(f"argument --size: invalid size '{size}', expected WIDTHxHEIGHT")
+        return width, height
@@ -0,0 +1,332 @@
+import importlib
+from abc import ABC, abstractmethod
+from glob import glob
+from os import getenv, path
+from random import Random
+from threading import Condition, Thread
+from time import monotonic, sleep
+from typing import NamedTuple
+
+import numpy as np
+from cv2.typing import MatLike
+
+from image_io import ImageIO
+from logger import Logger
+from synthetic import Synthetic
+
+
+class Frame(NamedTuple):
+    """A frame of the camera."""
+
+    image: MatLike
+    # * Monotonic time the frame was acquired at, in seconds
+    timestamp: float
+    # * Number of the frame since the acquisition started, starting at 1
+    sequence: int
+
+
+class CameraBackend(ABC):
+    """
+    Base of the cameras a session acquires from, CAMERA_BACKEND picks "neoapi" for the
+    Baumer camera or "virtual" to replay images without one.
+    """
+
+    BACKEND = getenv("CAMERA_BACKEND", "neoapi")
+
+    @classmethod
+    def create(cls) -> "CameraBackend":
+        """Get the backend chosen by CAMERA_BACKEND."""
+
+        if cls.BACKEND == "virtual":
+            return VirtualBackend()
+        return NeoapiBackend()
+
+    @abstractmethod
+    def connect(self):
+        """Connect to the camera and start the acquisition."""
+
+    @abstractmethod
+    def grab(self) -> MatLike | None:
+        """
+        Wait for the next frame, the array may be reused by the following grab.
+
+        Returns
+        -------
+        MatLike | None
+            The frame, None if no frame came in time.
+        """
+
+    @abstractmethod
+    def disconnect(self):
+        """Disconnect from the camera."""
+
+
+class NeoapiBackend(CameraBackend):
+    """
+    The Baumer camera, through the neoapi module imported on connection, so a fake
+    module can stand in for it.
+    """
+
+    # "off" acquires continuously, otherwise the trigger source, like "Line1"
+    TRIGGER = getenv("CAMERA_TRIGGER", "off")
+    # Maximum time a grab blocks waiting for the camera, bounding how long closing the
+    # session can take
+    GRAB_TIMEOUT_MS = int(getenv("CAMERA_GRAB_TIMEOUT_MS", "400"))
+
+    def __init__(self, trigger: str | None = None, grab_timeout_ms: int | None = None):
+        self.__trigger = trigger or self.TRIGGER
+        self.__grab_timeout_ms = grab_timeout_ms or self.GRAB_TIMEOUT_MS
+        self.__camera = None
+
+    def connect(self):
+        neoapi = importlib.import_module("neoapi")
+        self.__camera = neoapi.Cam()
+        self.__camera.Connect()
+        if self.__trigger != "off":
+            self.__camera.f.TriggerMode.SetString("On")
+            self.__camera.f.TriggerSource.SetString(self.__trigger)
+        Logger.debug(f"Connected to the camera, trigger {self.__trigger}.")
+
+    def grab(self) -> MatLike | None:
+        image = self.__camera.GetImage(self.__grab_timeout_ms)
+        if image.IsEmpty():
+            return None
+        return image.GetNPArray()
+
+    def disconnect(self):
+        self.__camera.Disconnect()
+
+
+class VirtualBackend(CameraBackend):
+    """
+    A camera replaying images at a frame rate, with a jitter on the time between frames
+    and a rate of dropped frames, to load test the program without the camera.
+
+    The images are the ones of a directory or glob, read once, or synthetic plates.
+    """
+
+    # Directory or glob of the images replayed, or "synthetic" for synthetic plates
+    SOURCE = getenv("VIRTUAL_SOURCE", "synthetic")
+    FPS = float(getenv("VIRTUAL_FPS", "10"))
+    # Standard deviation of the time between frames
+    JITTER_MS = float(getenv("VIRTUAL_JITTER_MS", "0"))
+    # Fraction of the frames dropped, as a camera missing a trigger
+    DROP = float(getenv("VIRTUAL_DROP", "0"))
+    # Number of holes and plates of the synthetic source
+    HOLES = int(getenv("VIRTUAL_HOLES", "48"))
+    PLATES = int(getenv("VIRTUAL_PLATES", "4"))
+
+    def __init__(
+        self,
+        source: str | None = None,
+        fps: float | None = None,
+        jitter_ms: float | None = None,
+        drop: float | None = None,
+        seed: int = 0,
+    ):
+        self.__source = source or self.SOURCE
+        self.__period = 1 / (fps or self.FPS)
+        self.__jitter = (self.JITTER_MS if jitter_ms is None else jitter_ms) / 1000
+        self.__drop = self.DROP if drop is None else drop
+        self.__random = Random(seed)
+        self.__images: list[MatLike] = []
+        self.__count = 0
+        self.__next = 0.0
+        self.dropped = 0
+
+    def connect(self):
+        if self.__source == "synthetic":
+            self.__images = [
+                Synthetic.plate(holes=self.HOLES, seed=seed)
+                for seed in range(self.PLATES)
+            ]
+        else:
+            pattern = (
+                path.join(self.__source, "*")
+                if path.isdir(self.__source)
+                else self.__source
+            )
+            for image_file in sorted(glob(pattern)):
+                if ImageIO.is_image(image_file):
+                    image = ImageIO.read(image_file)
+                    if image is not None:
+                        self.__images.append(np.ascontiguousarray(image))
+
+        if len(self.__images) == 0:
+            raise FileNotFoundError(f"No images in {self.__source}.")
+
+        self.__next = monotonic()
+        Logger.debug(
+            f"Virtual camera: {len(self.__images)} images of {self.__source}, "
+            + f"{1 / self.__period:.1f} fps."
+        )
+
+    def grab(self) -> MatLike | None:
+        self.__next += max(self.__random.gauss(self.__period, self.__jitter), 0)
+        sleep(max(self.__next - monotonic(), 0))
+
+        image = self.__images[self.__count % len(self.__images)]
+        self.__count += 1
+        if self.__random.random() < self.__drop:
+            self.dropped += 1
+            return None
+        return image
+
+    def disconnect(self):
+        self.__images = []
+
+
+class CameraSession:
+    """
+    Keeps the camera connected and acquires frames from a background thread into a
+    ring of preallocated frames, handing out the latest or the next one, so the
+    connection is set up once and not for every piece.
+    """
+
+    # Number of frames kept, the oldest is overwritten by each new frame
+    RING_SIZE = int(getenv("CAMERA_RING_SIZE", "4"))
+
+    __shared: "CameraSession | None" = None
+
+    def __init__(
+        self, backend: CameraBackend | None = None, ring_size: int | None = None
+    ):
+        """
+        Connect to the camera and start the acquisition.
+
+        Parameters
+        ----------
+        backend : CameraBackend | None
+            The camera, defaults to the one chosen by CAMERA_BACKEND.
+        ring_size : int | None
+            Number of frames kept, defaults to RING_SIZE.
+        """
+
+        self.backend = backend or CameraBackend.create()
+        self.__ring_size = max(ring_size or self.RING_SIZE, 1)
+        self.__ring: list[np.ndarray] = []
+        self.__timestamps = [0.0] * self.__ring_size
+        self.__sequence = 0
+        self.__error: Exception | None = None
+        self.__running = True
+        self.__condition = Condition()
+        # * Time from the connection to the first frame, None until it comes
+        self.first_frame_ms: float | None = None
+
+        self.__started = monotonic()
+        self.backend.connect()
+
+        self.__thread = Thread(target=self.__acquire, name="Camera", daemon=True)
+        self.__thread.start()
+
+    @classmethod
+    def shared(cls) -> "CameraSession":
+        """Get the session kept for the whole program, starting it on first use."""
+
+        if cls.__shared is None:
+            cls.__shared = CameraSession()
+        return cls.__shared
+
+    @classmethod
+    def close_shared(cls):
+        """Close the session kept for the whole program, if started."""
+
+        if cls.__shared is not None:
+            cls.__shared.close()
+            cls.__shared = None
+
+    def latest(self) -> Frame | None:
+        """
+        Get a copy of the latest frame, None if no frame was acquired yet.
+
+        Raises
+        ------
+        Exception
+            The error that stopped the acquisition.
+        """
+
+        with self.__condition:
+            if self.__error is not None:
+                raise self.__error
+            if self.__sequence == 0:
+                return None
+            return self.__frame(self.__sequence)
+
+    def next(self, timeout: float) -> Frame:
+        """
+        Wait for a frame acquired after this call and get a copy of it.
+
+        Parameters
+        ----------
+        timeout : float
+            Maximum time to wait in seconds.
+
+        Raises
+        ------
+        TimeoutError
+            If no frame was acquired in time.
+        Exception
+            The error that stopped the acquisition.
+        """
+
+        with self.__condition:
+            sequence = self.__sequence
+            self.__condition.wait_for(
+                lambda: self.__sequence > sequence or self.__error is not None,
+                timeout,
+            )
+            if self.__error is not None:
+                raise self.__error
+            if self.__sequence == sequence:
+                raise TimeoutError(f"No frame in {timeout:.3f}s.")
+            return self.__frame(self.__sequence)
+
+    def close(self):
+        """Stop the acquisition and disconnect from the camera."""
+
+        self.__running = False
+        self.__thread.join()
+        try:
+            self.backend.disconnect()
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+        Logger.debug("Disconnected from the camera.")
+
+    def __frame(self, sequence: int) -> Frame:
+        """Copy a frame out of the ring, the caller holds the condition."""
+
+        slot = (sequence - 1) % self.__ring_size
+        return Frame(self.__ring[slot].copy(), self.__timestamps[slot], sequence)
+
+    def __acquire(self):
+        """Copy each frame of the camera into the next slot of the ring."""
+
+        while self.__running:
+            try:
+                array = self.backend.grab()
+                if array is None:
+                    continue
+                timestamp = monotonic()
+            except Exception as error:
+                Logger.warning(f"CAMERA | Acquisition stopped: {error}")
+                with self.__condition:
+                    self.__error = error
+                    self.__condition.notify_all()
+                return
+
+            if self.__sequence == 0:
+                self.first_frame_ms = (timestamp - self.__started) * 1000
+                Logger.info(f"First frame after {self.first_frame_ms:.1f}ms.")
+
+            with self.__condition:
+                slot = self.__sequence % self.__ring_size
+                # * The frames are allocated once, when the size of the image is known
+                if len(self.__ring) == 0 or self.__ring[0].shape != array.shape:
+                    self.__ring = [
+                        np.empty(array.shape, array.dtype)
+                        for _ in range(self.__ring_size)
+                    ]
+                np.copyto(self.__ring[slot], array)
+                self.__timestamps[slot] = timestamp
+                self.__sequence += 1
+                self.__condition.notify_all()
@@ -0,0 +1,215 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob, has_magic
+from json import dump
+from multiprocessing import get_context
+from multiprocessing.util import Finalize
+from time import perf_counter
+from typing import Literal, TypedDict
+
+from .process import Process
+
+from debug_images import DebugImages
+from image_io import ImageIO
+from logger import Logger
+from station import Roi, Station
+from timings import Timings
+
+
+class BatchResult(TypedDict):
+    """Type for the result of each image in the batch summary."""
+
+    image: str
+    json_file: str
+    code: int
+    seconds: float
+
+
+class Batch:
+    """
+    The class responsible for running the process command over many images, fanned out
+    across a pool of worker processes.
+    """
+
+    IMAGE_EXTENSIONS = ImageIO.EXTENSIONS
+
+    @classmethod
+    def run(
+        cls,
+        read_images: str,
+        json_dir: str,
+        workers: int,
+        log: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        debug_images: Literal["off", "sampled", "always"],
+        debug_every: int,
+        debug_dir: str,
+        template_file: str | None = None,
+    ):
+        """
+        Run the process command for every image in a directory or matching a glob,
+        writing one JSON per image and a summary.json to the json directory.
+
+        Parameters
+        ----------
+        read_images : str
+            Directory or glob pattern of the images that will be processed.
+        json_dir : str
+            Directory the JSON files are written to, each named after its image.
+        workers : int
+            Number of worker processes.
+        log, debug_images, debug_every, debug_dir
+            The logging and debug images settings for the workers, each worker saves
+            its debug images to its own sub directory of debug_dir.
+        template_file : str | None
+            Path and only name of the template JSON, without the .json extension, to
+            drop the contours that can not be one of its holes.
+        """
+
+        Logger.debug("Running batch process command.")
+
+        images = cls.find_images(read_images)
+        if len(images) == 0:
+            # ! ERROR CODE 15
+            Logger.err_exit(f"No images found in {read_images}.", code=15)
+
+        try:
+            os.makedirs(json_dir, exist_ok=True)
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed creating JSON directory {json_dir}.", code=9)
+
+        workers = max(min(workers, len(images)), 1)
+        Logger.info(f"Processing {len(images)} images with {workers} workers.")
+
+        results: list[BatchResult] = []
+        start = perf_counter()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=get_context("spawn"),
+            initializer=cls._init_worker,
+            initargs=(
+                log,
+                debug_images,
+                debug_every,
+                debug_dir,
+                Station.ROI,
+                Timings.file(),
+            ),
+        ) as executor:
+            futures = [
+                executor.submit(
+                    cls._process,
+                    image,
+                    os.path.join(
+                        json_dir, os.path.splitext(os.path.basename(image))[0]
+                    ),
+                    template_file,
+                )
+                for image in images
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                if result["code"] != 0:
+                    Logger.warning(
+                        f"{result['image']} failed with code {result['code']}."
+                    )
+
+        elapsed = perf_counter() - start
+        failed = [result for result in results if result["code"] != 0]
+        summary = {
+            "images": len(images),
+            "processed": len(images) - len(failed),
+            "failed": len(failed),
+            "workers": workers,
+            "elapsed_s": elapsed,
+            "images_per_s": len(images) / elapsed,
+            "mean_image_s": sum(result["seconds"] for result in results) / len(results),
+            "failures": sorted(failed, key=lambda x: x["image"]),
+        }
+
+        Logger.info(
+            f"Processed {summary['processed']}/{len(images)} images in {elapsed:.2f}s"
+            + f" ({summary['images_per_s']:.2f} images/s)."
+        )
+
+        try:
+            with open(os.path.join(json_dir, "summary.json"), "w") as file:
+                dump(summary, file, indent=4, ensure_ascii=False)
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed writing to JSON {json_dir}/summary.json.", code=9)
+
+    @classmethod
+    def is_batch(cls, read_image: str) -> bool:
+        """If the image path is a directory or a glob pattern instead of an image."""
+
+        return os.path.isdir(read_image) or has_magic(read_image)
+
+    @classmethod
+    def find_images(cls, read_images: str) -> list[str]:
+        """Get the sorted images in a directory or matching a glob pattern."""
+
+        if os.path.isdir(read_images):
+            read_images = os.path.join(read_images, "*")
+
+        return sorted(
+            image
+            for image in glob(read_images)
+            if image.lower().endswith(cls.IMAGE_EXTENSIONS)
+            and not ImageIO.is_temporary(image)
+            and os.path.isfile(image)
+        )
+
+    @classmethod
+    def _init_worker(
+        cls,
+        log: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        debug_images: Literal["off", "sampled", "always"],
+        debug_every: int,
+        debug_dir: str,
+        roi: Roi,
+        timings_file: str | None,
+    ):
+        """
+        Set up the logger, the ROI of the station, the timings appended to the file of
+        the main process and a debug images directory of its own in a worker.
+        """
+
+        Logger(log)
+        Station.ROI = roi
+        Timings.configure(timings_file, append=True)
+        DebugImages.configure(
+            debug_images,
+            debug_every,
+            os.path.join(debug_dir, f"worker_{os.getpid()}"),
+            per_piece=True,
+        )
+        # * Workers do not run atexit handlers, so the images are flushed on exit here
+        Finalize(None, DebugImages.flush, exitpriority=10)
+        Finalize(None, Timings.close, exitpriority=10)
+
+    @classmethod
+    def _process(
+        cls, read_image: str, json_file: str, template_file: str | None
+    ) -> BatchResult:
+        """Process a single image in a worker, turning error exits into codes."""
+
+        start = perf_counter()
+        code = 0
+        try:
+            Process.run(read_image, json_file, template_file)
+        except SystemExit as error:
+            code = error.code if isinstance(error.code, int) else 1
+        except Exception as error:
+            Logger.critical(f"Unexpected error processing {read_image}: {error}")
+            code = -1
+
+        return {
+            "image": read_image,
+            "json_file": f"{json_file}.json",
+            "code": code,
+            "seconds": perf_counter() - start,
+        }
@@ -0,0 +1,288 @@
+import os
+import resource
+import shutil
+import tracemalloc
+from statistics import mean, median, quantiles
+from tempfile import TemporaryDirectory
+from time import monotonic, perf_counter
+from typing import Callable, TypeVar
+
+import cv2 as cv
+
+from .capture import Capture
+from .compare import Compare
+from .process import Process
+from .train import Train
+
+from camera import CameraSession, VirtualBackend
+from logger import Logger
+from self_types import NewData
+from synthetic import Synthetic
+from template_journal import TemplateJournal
+
+T = TypeVar("T")
+
+
+class Benchmark:
+    """The class responsible for timing the processing stages."""
+
+    # * Extraction modes and pyramid factors compared
+    EXTRACTIONS = [("canny", 0), ("binary", 0), ("canny", 4), ("binary", 4)]
+    # * Hole counts of the synthetic plates the whole pipeline is timed on
+    HOLE_COUNTS = [10, 100, 500, 1000, 5000]
+    # * The train command reads exactly Train.PIECES pieces
+    TRAIN_PIECES = Train.PIECES
+
+    @classmethod
+    def run(cls, read_image: str, repeat: int):
+        """
+        Run the benchmark command, timing each stage of the process command for every
+        extraction mode and checking the modes find the same areas.
+
+        Parameters
+        ----------
+        read_image : str
+            Path to the image that will be processed.
+        repeat : int
+            Number of times each stage is run, the median time is reported.
+        """
+
+        Logger.debug("Running benchmark command.")
+
+        repeat = max(repeat, 1)
+        load_times: list[float] = []
+        for _ in range(repeat):
+            image = cls.__time(lambda: Process.load(read_image), load_times)
+
+        print(f"Benchmark of {read_image}, median of {repeat} runs.")
+        print(f"{'stage':<20}{'mode':<16}{'ms':>10}")
+        print(f"{'load':<20}{'-':<16}{median(load_times) * 1000:>10.2f}")
+
+        results: dict[str, NewData] = {}
+        for mode, pyramid in cls.EXTRACTIONS:
+            name = mode if pyramid <= 1 else f"{mode} 1/{pyramid}"
+            extract_times: list[float] = []
+            measure_times: list[float] = []
+            for _ in range(repeat):
+                box, contours = cls.__time(
+                    lambda: Process.extract(image, mode, pyramid), extract_times
+                )
+                results[name] = cls.__time(
+                    lambda: Process.measure(image.copy(), box, contours), measure_times
+                )
+
+            print(f"{'extract':<20}{name:<16}{median(extract_times) * 1000:>10.2f}")
+            print(f"{'measure':<20}{name:<16}{median(measure_times) * 1000:>10.2f}")
+
+        names = list(results.keys())
+        reference = names[0]
+        reference_areas = sorted(
+            area["area_px"] for area in results[reference]["areas"]
+        )
+        for name in names[1:]:
+            areas = sorted(area["area_px"] for area in results[name]["areas"])
+            print(
+                f"{name} against {reference}: "
+                + f"{results[name]['info']['total_areas']} / "
+                + f"{results[reference]['info']['total_areas']} areas, "
+                + f"area sizes {'match' if areas == reference_areas else 'differ'}."
+            )
+
+        Logger.info("Benchmark command finished.")
+
+    @classmethod
+    def pipeline(cls, hole_counts: list[int], repeat: int):
+        """
+        Run the benchmark command without an image, timing the process, train and
+        compare commands on synthetic plates of each hole count, written to a
+        temporary directory. The throughput is of the median time and the memory is
+        the peak traced by tracemalloc on a separate untimed run, plus the maximum
+        resident size of the program so far.
+
+        Parameters
+        ----------
+        hole_counts : list[int]
+            The hole counts of the plates.
+        repeat : int
+            Number of times train and compare are run, the median time is reported.
+        """
+
+        Logger.debug("Running pipeline benchmark command.")
+
+        repeat = max(repeat, 1)
+        print(f"Pipeline benchmark on synthetic plates, median of {repeat} runs.")
+        print(
+            f"{'holes':>6}  {'stage':<10}{'ms':>10}{'pieces/s':>10}"
+            + f"{'peak MiB':>10}{'max RSS MiB':>13}"
+        )
+
+        for holes in hole_counts:
+            with TemporaryDirectory() as directory:
+                plates = [
+                    os.path.join(directory, f"plate_{i:02d}.png")
+                    for i in range(1, cls.TRAIN_PIECES + 1)
+                ]
+                for seed, plate in enumerate(plates):
+                    cv.imwrite(plate, Synthetic.plate(holes=holes, seed=seed))
+
+                name = os.path.join(directory, "plate")
+                template = os.path.join(directory, "template")
+                # * A piece of the training set is always within the 3 standard
+                # * deviations the compare allows, as no sample of 10 is farther than
+                # * 9 / sqrt(10) of them from the mean, while a new plate fails some of
+                # * the hundreds of checks of the bigger plates by chance
+                piece = plates[0][:-4]
+                image_save_file = os.path.join(directory, "errors.png")
+
+                process_times: list[float] = []
+                for plate in plates:
+                    cls.__time(lambda: Process.run(plate, plate[:-4]), process_times)
+                process_peak = cls.__peak(
+                    lambda: Process.run(plates[0], plates[0][:-4])
+                )
+                cls.__report(holes, "process", process_times, process_peak)
+
+                train_times: list[float] = []
+                for _ in range(repeat):
+                    cls.__time(lambda: Train.run(name, template), train_times)
+                train_peak = cls.__peak(lambda: Train.run(name, template))
+                cls.__report(holes, "train", train_times, train_peak)
+
+                # * Every compare starts from the trained template, as the compare of
+                # * a correct piece adds it to the template
+                shutil.copyfile(f"{template}.json", f"{template}_trained.json")
+                compare_times: list[float] = []
+                errors = None
+                for _ in range(repeat):
+                    cls.__restore(template)
+                    errors = cls.__time(
+                        lambda: Compare.run(
+                            image_save_file, plates[0], piece, template
+                        ),
+                        compare_times,
+                    )
+                cls.__restore(template)
+                compare_peak = cls.__peak(
+                    lambda: Compare.run(image_save_file, plates[0], piece, template)
+                )
+                cls.__report(holes, "compare", compare_times, compare_peak)
+                if errors is not None:
+                    print(f"{'':>6}  incorrect piece, compare includes the error image")
+
+        Logger.info("Benchmark command finished.")
+
+    @classmethod
+    def camera(cls, frames: int, template_file: str | None):
+        """
+        Run the benchmark command on the camera, usually the virtual one, processing
+        its frames in memory like the inspect command and reporting the throughput and
+        the latency from the frame acquisition to the result. The frames acquired
+        while a piece is processed are skipped, as on the line.
+
+        Parameters
+        ----------
+        frames : int
+            Number of frames processed.
+        template_file : str | None
+            Path and only name of the template JSON, without the .json extension, to
+            also compare the pieces with a copy of it.
+        """
+
+        Logger.debug("Running camera benchmark command.")
+
+        session = CameraSession.shared()
+        latencies: list[float] = []
+        skipped = 0
+        sequence = None
+
+        with TemporaryDirectory() as directory:
+            template = None
+            if template_file is not None:
+                template = os.path.join(directory, "template")
+                shutil.copyfile(f"{template_file}.json", f"{template}.json")
+                if os.path.isfile(TemplateJournal.file(template_file)):
+                    shutil.copyfile(
+                        TemplateJournal.file(template_file),
+                        TemplateJournal.file(template),
+                    )
+
+            start = monotonic()
+            for _ in range(max(frames, 1)):
+                try:
+                    frame = session.next(Capture.TIMEOUT_MS / 1000)
+                except Exception as error:
+                    Logger.debug(f"Exception: {error}")
+                    # ! ERROR CODE 13
+                    Logger.err_exit("CAMERA | Unable to capture image.", code=13)
+
+                if sequence is not None:
+                    skipped += frame.sequence - sequence - 1
+                sequence = frame.sequence
+
+                data = Process.run_frame(frame.image, template_file=template)
+                if template is not None:
+                    Compare.run_frame(data, frame.image, template)
+                latencies.append(monotonic() - frame.timestamp)
+            elapsed = monotonic() - start
+
+        # * quantiles needs 2 samples, every percentile of a single one is itself
+        cuts = (
+            quantiles(latencies, n=100, method="inclusive")
+            if len(latencies) > 1
+            else latencies * 99
+        )
+        print(f"Camera benchmark of {len(latencies)} frames in {elapsed:.2f}s.")
+        print(f"{'results/s':<20}{len(latencies) / elapsed:>10.2f}")
+        print(f"{'skipped frames':<20}{skipped:>10}")
+        if session.first_frame_ms is not None:
+            print(f"{'first frame ms':<20}{session.first_frame_ms:>10.2f}")
+        if isinstance(session.backend, VirtualBackend):
+            print(f"{'dropped frames':<20}{session.backend.dropped:>10}")
+        print(f"{'latency':<20}{'ms':>10}")
+        print(f"{'mean':<20}{mean(latencies) * 1000:>10.2f}")
+        print(f"{'p50':<20}{cuts[49] * 1000:>10.2f}")
+        print(f"{'p95':<20}{cuts[94] * 1000:>10.2f}")
+        print(f"{'p99':<20}{cuts[98] * 1000:>10.2f}")
+        print(f"{'max':<20}{max(latencies) * 1000:>10.2f}")
+
+        Logger.info("Benchmark command finished.")
+
+    @classmethod
+    def __restore(cls, template: str):
+        """Put back the trained template, without the pieces journaled since."""
+
+        shutil.copyfile(f"{template}_trained.json", f"{template}.json")
+        if os.path.isfile(TemplateJournal.file(template)):
+            os.remove(TemplateJournal.file(template))
+
+    @classmethod
+    def __report(cls, holes: int, stage: str, times: list[float], peak: int):
+        """Print the median time, throughput and memory of a stage."""
+
+        # * ru_maxrss is in kilobytes on Linux
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(
+            f"{holes:>6}  {stage:<10}{median(times) * 1000:>10.2f}"
+            + f"{1 / median(times):>10.2f}{peak / 2**20:>10.1f}{max_rss:>13.1f}"
+        )
+
+    @classmethod
+    def __peak(cls, stage: Callable[[], object]) -> int:
+        """Run the stage and get the peak of memory traced while it ran in bytes."""
+
+        tracemalloc.start()
+        try:
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak
+
+    @classmethod
+    def __time(cls, stage: Callable[[], T], times: list[float]) -> T:
+        """Run the stage and append its duration in seconds to times."""
+
+        start = perf_counter()
+        result = stage()
+        times.append(perf_counter() - start)
+        return result
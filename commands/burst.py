@@ -0,0 +1,173 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from time import perf_counter
+from typing import Literal
+
+from cv2.typing import MatLike
+
+from .batch import Batch
+from .capture import Capture
+from .process import Process
+from .train import Train
+
+from camera import CameraSession
+from debug_images import DebugImages
+from image_io import ImageIO
+from image_writer import ImageWriter
+from logger import Logger
+from station import Station
+from timings import Timings
+
+
+class Burst:
+    """
+    The class responsible for grabbing many frames in a single camera session, to
+    collect a training set in one call.
+    """
+
+    # * Threads encoding the frames, so the grabs never wait for the disk
+    WRITERS = 2
+
+    @classmethod
+    def run(
+        cls,
+        frames: int,
+        image_save_file: str | None,
+        json_file: str | None,
+        template_file: str | None,
+        workers: int,
+        log: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+        debug_images: Literal["off", "sampled", "always"],
+        debug_every: int,
+        debug_dir: str,
+    ):
+        """
+        Run the burst command, grabbing the frames and writing them as
+        '<name>_{01-NN}.<ext>', processing them in a pool of workers as they arrive
+        into '<json>_{01-NN}.json', the names the train command expects.
+
+        Parameters
+        ----------
+        frames : int
+            Number of frames grabbed.
+        image_save_file : str | None
+            File the frames are named after, not written if None.
+        json_file : str | None
+            Path and only name the JSON files are named after, without the .json
+            extension, not processed if None.
+        template_file : str | None
+            Path and only name of the template JSON, without the .json extension,
+            trained from the processed frames if given.
+        workers : int
+            Number of worker processes.
+        log, debug_images, debug_every, debug_dir
+            The logging and debug images settings for the workers.
+        """
+
+        Logger.debug("Running burst command.")
+
+        if image_save_file is not None and not ImageIO.is_image(image_save_file):
+            # ! ERROR CODE 4
+            Logger.err_exit(f"{image_save_file} is not a supported image.", code=4)
+
+        if template_file is not None and json_file is None:
+            # ! ERROR CODE 3
+            Logger.err_exit("Missing JSON path.", code=3)
+
+        if template_file is not None and frames != Train.PIECES:
+            # ! ERROR CODE 20
+            Logger.err_exit(
+                f"The template is trained from exactly {Train.PIECES} frames.", code=20
+            )
+        frames = max(frames, 1)
+
+        writer = None
+        if image_save_file is not None:
+            writer = ImageWriter(workers=cls.WRITERS, max_queue=frames, block=True)
+
+        executor = None
+        if json_file is not None:
+            executor = ProcessPoolExecutor(
+                max_workers=max(min(workers, frames), 1),
+                mp_context=get_context("spawn"),
+                initializer=Batch._init_worker,
+                initargs=(
+                    log,
+                    debug_images,
+                    debug_every,
+                    debug_dir,
+                    Station.ROI,
+                    Timings.file(),
+                ),
+            )
+
+        futures: list[Future[int]] = []
+        start = perf_counter()
+        try:
+            session = CameraSession.shared()
+            for i in range(1, frames + 1):
+                # * Each grab is a piece of its own, the frames are timed by the workers
+                with Timings.piece(f"grab_{i:02d}"), Timings.stage("camera_grab"):
+                    image = session.next(Capture.TIMEOUT_MS / 1000).image
+                Logger.debug(f"Frame {i} of {frames} grabbed.")
+
+                # * Each frame is a copy of the ring, so it is never changed after
+                if writer is not None and image_save_file is not None:
+                    name, extension = os.path.splitext(image_save_file)
+                    writer.submit(f"{name}_{i:02d}{extension}", image)
+                if executor is not None:
+                    futures.append(
+                        executor.submit(
+                            cls._process_frame, image, f"{json_file}_{i:02d}"
+                        )
+                    )
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 13
+            Logger.err_exit("CAMERA | Unable to capture image.", code=13)
+        grabbed = perf_counter() - start
+
+        failed = 0
+        if executor is not None:
+            for i, future in enumerate(futures, start=1):
+                code = future.result()
+                if code != 0:
+                    failed += 1
+                    Logger.warning(f"Frame {i} failed with code {code}.")
+            executor.shutdown()
+
+        if writer is not None:
+            writer.flush()
+            if writer.failed > 0:
+                # ! ERROR CODE 6
+                Logger.err_exit(
+                    f"OPENCV | Unable to write {writer.failed} frames.", code=6
+                )
+
+        Logger.info(
+            f"Grabbed {frames} frames in {grabbed:.2f}s, done in "
+            + f"{perf_counter() - start:.2f}s, {failed} failed processing."
+        )
+
+        if template_file is not None and json_file is not None:
+            Train.run(json_file, template_file)
+
+        Logger.info("Burst command finished.")
+
+    @classmethod
+    def _process_frame(cls, frame: MatLike, json_file: str) -> int:
+        """Process a frame in a worker, turning error exits into codes."""
+
+        piece = os.path.basename(json_file)
+        DebugImages.start_piece(piece)
+        try:
+            with Timings.piece(piece):
+                Process.run_frame(frame, json_file)
+        except SystemExit as error:
+            return error.code if isinstance(error.code, int) else 1
+        except Exception as error:
+            Logger.critical(f"Unexpected error processing {piece}: {error}")
+            return -1
+
+        return 0
@@ -1,43 +1,126 @@
-import cv2 as cv
-from logger import Logger
-import neoapi
+import os
+from time import monotonic
 
-# neoapi = any
+from cv2.typing import MatLike
 
-# # ? This is a workaround for not installing the neoapi package on Windows, since it
-# # ? will not be used on Windows.
-# if not os.name == "nt":
+from camera import CameraSession
+from image_io import ImageIO
+from image_writer import ImageWriter
+from logger import Logger
+from timings import Timings
 
 
 class Capture:
+
+    # Maximum time to wait for a frame of the camera
+    TIMEOUT_MS = int(os.getenv("CAPTURE_TIMEOUT_MS", "10000"))
+    # Number of times the frame is waited for again after a timeout or a camera error
+    RETRIES = int(os.getenv("CAPTURE_RETRIES", "0"))
+    # Threads writing the frames and frames waiting for them, the capture waits for a
+    # free place when they are all taken
+    WRITERS = int(os.getenv("CAPTURE_WRITERS", "2"))
+    MAX_QUEUE = int(os.getenv("CAPTURE_MAX_QUEUE", "4"))
+
+    __writer: ImageWriter | None = None
+
     @classmethod
-    def run(cls, image_save_file: str):
+    def run(cls, image_save_file: str, wait: bool = False):
+        """
+        Run the capture command, grabbing a frame and handing it to the background
+        writers, so the next acquisition can start while it is encoded.
+
+        Parameters
+        ----------
+        image_save_file : str
+            File to write the frame to.
+        wait : bool
+            If the frame is written before returning, instead of in the background.
+        """
+
         Logger.debug("Running capture command.")
 
-        if not image_save_file.endswith(".png"):
+        if not ImageIO.is_image(image_save_file):
             # ! ERROR CODE 4
-            Logger.err_exit(f"{image_save_file} is not PNG.", code=4)
-        try:
-            camera = neoapi.Cam()
-            camera.Connect()
-
-            Logger.debug("Connected to the camera.")
-            image = None
-            for _ in range(200):
-                img = camera.GetImage()
-                if not img.IsEmpty():
-                    Logger.debug("Image captured.")
-                    image = img.GetNPArray()
-                    break
-
-            if image is None:
-                raise Exception("No image found.")
-
-            cv.imwrite(image_save_file, image)
-
-        except (neoapi.NeoException, Exception) as err:
-            Logger.debug(f"Exception: {err}")
-            # ! ERROR CODE 13
-            Logger.err_exit("CAMERA | Unable to capture image.", code=13)
-
-        Logger.debug("Image written to disk.")
+            Logger.err_exit(f"{image_save_file} is not a supported image.", code=4)
+
+        piece = os.path.splitext(os.path.basename(image_save_file))[0]
+        with Timings.piece(piece):
+            image = cls.grab()
+            if wait:
+                with Timings.stage("encode"):
+                    written = ImageIO.write(image_save_file, image)
+                if not written:
+                    # ! ERROR CODE 6
+                    Logger.err_exit(
+                        f"OPENCV | Unable to read/write {image_save_file}.", code=6
+                    )
+                Logger.debug("Image written to disk.")
+                return
+
+            if cls.__writer is None:
+                cls.__writer = ImageWriter(cls.WRITERS, cls.MAX_QUEUE, block=True)
+            # * The frame is a copy of the ring, so it is not changed while written
+            with Timings.stage("enqueue"):
+                cls.__writer.submit(image_save_file, image)
+
+        Logger.debug(f"Image queued, {cls.__writer.depth()} waiting to be written.")
+
+    @classmethod
+    def flush(cls):
+        """Wait for the queued frames to be written and log the writers' stats."""
+
+        if cls.__writer is None:
+            return
+
+        cls.__writer.flush()
+        writer = cls.__writer
+        Logger.info(
+            f"Capture writer: {writer.written} images, "
+            + f"{writer.write_ms / max(writer.written, 1):.1f}ms mean write, "
+            + f"{writer.max_write_ms:.1f}ms max, {writer.max_depth} max waiting."
+        )
+        if writer.failed > 0:
+            # ! ERROR CODE 6
+            Logger.err_exit(f"OPENCV | Unable to write {writer.failed} images.", code=6)
+
+    @classmethod
+    def grab(cls) -> MatLike:
+        """
+        Get the next frame of the camera session, connecting to the camera on first
+        use and keeping the connection for the following pieces.
+
+        Each attempt waits up to TIMEOUT_MS, a camera error reconnects on the next
+        one, and the program exits once the RETRIES are used.
+
+        Returns
+        -------
+        MatLike
+            The image as captured by the camera.
+        """
+
+        timeout = cls.TIMEOUT_MS / 1000
+        start = monotonic()
+        for attempt in range(1, cls.RETRIES + 2):
+            try:
+                with Timings.stage("camera_connect"):
+                    session = CameraSession.shared()
+
+                with Timings.stage("camera_grab"):
+                    frame = session.next(timeout)
+                Logger.debug(f"Image {frame.sequence} captured.")
+                return frame.image
+
+            except Exception as err:
+                Logger.warning(
+                    f"CAMERA | Attempt {attempt} of {cls.RETRIES + 1} failed: {err}"
+                )
+                # * A timeout keeps the session, a broken one is reconnected
+                if not isinstance(err, TimeoutError):
+                    CameraSession.close_shared()
+
+        # ! ERROR CODE 13
+        Logger.err_exit(
+            "CAMERA | Unable to capture image, no frame in "
+            + f"{(monotonic() - start) * 1000:.0f}ms.",
+            code=13,
+        )
@@ -1,16 +1,21 @@
 import os
 from decimal import Decimal
 from json import dumps, load
-from typing import Literal, cast
+from typing import Callable, Literal, cast
 
-from .train import Train
+import numpy as np
+from cv2.typing import MatLike
 
+from compiled_template import CompiledTemplate
 from correct import Correct
 from logger import Logger
-from self_types import BaseData, ErrorAreas, Errors, NewData
+from matching import Matching
+from self_types import Area, BaseArea, BaseData, ErrorAreas, Errors, NewData
+from template_journal import TemplateJournal
+from timings import Timings
 from utils import (
     DecimalEncoder,
-    fix_ids,
+    atomic_write,
     herons_formula,
     object_hook_decimal,
     to_image_reference,
@@ -26,7 +31,7 @@ class Compare:
         read_image: str,
         json_file: str,
         template_file: str,
-    ):
+    ) -> Errors | None:
         """
         Run the compare command, it will compare the image with the template and return
         the differences.
@@ -46,84 +51,222 @@ class Compare:
         template_file : str
             Path and only name of the JSON file that will be read or written, without
             the .json extension.
+
+        Returns
+        -------
+        Errors | None
+            The errors found, None if the piece is correct.
         """
 
         Logger.debug("Running compare command.")
 
-        data = cls.__read_json(f"{json_file}.json")
+        with Timings.piece(os.path.splitext(os.path.basename(read_image))[0]):
+            return cls.__run(image_save_file, read_image, json_file, template_file)
+
+    @classmethod
+    def __run(
+        cls,
+        image_save_file: str,
+        read_image: str,
+        json_file: str,
+        template_file: str,
+    ) -> Errors | None:
+        """Compare the piece with the template, timing each stage."""
+
+        with Timings.stage("json_read"):
+            data = cls.__read_json(f"{json_file}.json")
         data = cast(NewData, data)
 
-        template = cls.__read_json(f"{template_file}.json")
-        template = cast(BaseData, template)
+        return cls.__check(
+            data,
+            template_file,
+            json_file,
+            lambda error: Correct.run(image_save_file, read_image, error),
+        )
 
-        error, order = cls.__compare(data, template)
+    @classmethod
+    def run_frame(
+        cls,
+        data: NewData,
+        frame: MatLike,
+        template_file: str,
+        json_file: str | None = None,
+        image_save_file: str | None = None,
+    ) -> Errors | None:
+        """
+        Compare the piece data the process command got from a frame in memory with the
+        template, drawing the errors on the frame itself.
+
+        Parameters
+        ----------
+        data : NewData
+            The piece data.
+        frame : MatLike
+            The image the piece data was taken from.
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+        json_file : str | None
+            Path and only name to write the errors JSON to, without the .json
+            extension, not written if None.
+        image_save_file : str | None
+            File to save the image with the errors to, not written if None.
+
+        Returns
+        -------
+        Errors | None
+            The errors found, None if the piece is correct.
+        """
+
+        Logger.debug("Running compare on frame.")
+
+        return cls.__check(
+            data,
+            template_file,
+            json_file,
+            (
+                None
+                if image_save_file is None
+                else lambda error: Correct.run_frame(image_save_file, frame, error)
+            ),
+        )
+
+    @classmethod
+    def __check(
+        cls,
+        data: NewData,
+        template_file: str,
+        json_file: str | None,
+        correct: Callable[[Errors], None] | None,
+    ) -> Errors | None:
+        """
+        Compare the piece data with the template, adding it to the template if correct
+        or counting the failures and saving the errors otherwise.
+
+        The correct callable draws and saves the error image, the errors JSON is only
+        written if there is a JSON file.
+        """
+
+        with Timings.stage("template_load"), TemplateJournal.lock(
+            template_file, shared=True
+        ):
+            compiled = CompiledTemplate.load(template_file)
+
+        # * The template is only read if the errors need it
+        loaded: list[BaseData] = []
+
+        def template() -> BaseData:
+            if len(loaded) == 0:
+                with Timings.stage("template_read"), TemplateJournal.lock(
+                    template_file, shared=True
+                ):
+                    loaded.append(TemplateJournal.read(template_file)[0])
+            return loaded[0]
+
+        with Timings.stage("compare"):
+            error, order = cls.__compare(data, template, compiled)
 
         if error is None:
             Logger.info("No errors found.")
-            template = Train.add_data(data, template, order)
-            try:
-                with open(f"{template_file}.json", "w") as file:
-                    file.write(
-                        dumps(
-                            template,
-                            indent=4,
-                            ensure_ascii=False,
-                            cls=DecimalEncoder,
-                        )
-                    )
-            except Exception as error:
-                Logger.debug(f"Exception: {error}")
-                # ! ERROR CODE 9
-                Logger.err_exit(f"Failed writing to JSON {template_file}.json.", code=9)
+            cls.__update(template_file, {"sample": data, "order": order}, data, order)
         else:
             Logger.info("Saving error data.")
-            if error["areas"] is not None:
-                for area in error["areas"]:
-                    if area["id"] >= 0:
-                        template["areas"][area["id"]]["failed"][
-                            cast(
-                                Literal["area", "center", "both", "unexistent"],
-                                area["kind"],
-                            )
-                        ] += 1
-            Correct.run(image_save_file, read_image, error)
+            if correct is not None:
+                correct(error)
             try:
-                with open(f"{json_file}_errors.json", "w") as file:
-                    file.write(
-                        dumps(
-                            error,
-                            indent=4,
-                            ensure_ascii=False,
-                            cls=DecimalEncoder,
+                if json_file is not None:
+                    with Timings.stage("json_write"):
+                        atomic_write(
+                            f"{json_file}_errors.json",
+                            dumps(
+                                error,
+                                indent=4,
+                                ensure_ascii=False,
+                                cls=DecimalEncoder,
+                            ),
                         )
-                    )
             except Exception as exception:
                 Logger.debug(f"Exception: {exception}")
                 # ! ERROR CODE 9
                 Logger.err_exit("Failed writing to JSON errors.json.", code=9)
+
+            # * Only the failures of template areas are counted in the template
+            failed = [
+                [area["id"], area["kind"]]
+                for area in error["areas"] or []
+                if area["kind"] in TemplateJournal.FAILED
+                and 0 <= area["id"] < len(compiled.ids)
+            ]
+            # * Read before the failures are journaled, so they are counted once
+            failed_template = template()
+            if len(failed) > 0:
+                cls.__update(template_file, {"failed": failed})
+
+            # * The template with the failures of the piece counted, only on failure
+            for area_id, kind in failed:
+                failed_template["areas"][area_id]["failed"][kind] += 1
             try:
-                with open(f"{template_file}_errors.json", "w") as file:
-                    file.write(
+                with Timings.stage("json_write"):
+                    atomic_write(
+                        f"{template_file}_errors.json",
                         dumps(
-                            template,
+                            failed_template,
                             indent=4,
                             ensure_ascii=False,
                             cls=DecimalEncoder,
-                        )
+                        ),
                     )
             except Exception as exception:
                 Logger.debug(f"Exception: {exception}")
                 # ! ERROR CODE 9
                 Logger.err_exit("Failed writing to JSON errors.json.", code=9)
 
+        return error
+
     @classmethod
-    def __compare(cls, data: NewData, template: BaseData) -> tuple[
+    def __update(
+        cls,
+        template_file: str,
+        entry: dict,
+        data: NewData | None = None,
+        order: (
+            list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]] | None
+        ) = None,
+    ):
+        """
+        Journal the sample or the failures of a piece, compacting the journal when
+        due. The template is loaded again under the lock, since other processes may
+        have updated it after the compare loaded it.
+        """
+
+        with TemplateJournal.lock(template_file):
+            with Timings.stage("template_update"):
+                compiled = CompiledTemplate.load(template_file)
+                journal = TemplateJournal.append(template_file, compiled.digest, entry)
+                compiled = CompiledTemplate.add(
+                    template_file, compiled, journal, data, order
+                )
+
+            if compiled.meta["entries"] >= TemplateJournal.COMPACT_EVERY:
+                with Timings.stage("template_write"):
+                    template, content = TemplateJournal.compact(template_file)
+                    CompiledTemplate.build(template_file, template, content)
+
+    @classmethod
+    def __compare(
+        cls,
+        data: NewData,
+        template: Callable[[], BaseData],
+        compiled: CompiledTemplate,
+    ) -> tuple[
         Errors | None,
         list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]],
     ]:
         """
         Compare two files to see if they are the same piece, accepts the name of the
         file without the .json extension.
+
+        The checks use the compiled template, the template is only read to build the
+        errors.
         """
         box: dict[Literal["correct_area_mm", "error_area_mm"], Decimal] | None = None
         order: list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]] = [
@@ -140,424 +283,161 @@ class Compare:
                     "mm_to_px_squared": True,
                 },
                 "rotate_correction": order,
-                "template_total_areas": template["info"]["total_areas"],
-                "sample_size": template["info"]["sample_size"],
+                "template_total_areas": compiled.meta["total_areas"],
+                "sample_size": compiled.meta["sample_size"],
             },
             "is_total_areas_correct": True,
             "areas": None,
             "box": box,
         }
 
-        if data["info"]["mm_to_px"] != template["info"]["mm_to_px"]:
+        if data["info"]["mm_to_px"] != Decimal(compiled.meta["mm_to_px"]):
             Logger.critical("mm_to_px is not the same.")
             error["info"]["constants_correct"]["mm_to_px"] = False
             wrong = True
 
-        if data["info"]["mm_to_px_squared"] != template["info"]["mm_to_px_squared"]:
+        if data["info"]["mm_to_px_squared"] != Decimal(
+            compiled.meta["mm_to_px_squared"]
+        ):
             Logger.critical("mm_to_px_squared is not the same.")
             error["info"]["constants_correct"]["mm_to_px_squared"] = False
             wrong = True
 
         # Checking if the area of the box is in an acceptable range
-        if not (
-            data["info"]["box"]["area_px"]
-            > template["info"]["stats"]["mean"]["area_px"]
-            - template["info"]["stats"]["stdev"]["area_px"] * 3
-        ) and (
-            data["info"]["box"]["area_px"]
-            < template["info"]["stats"]["mean"]["area_px"]
-            + template["info"]["stats"]["stdev"]["area_px"] * 3
-        ):
+        box_area_px = float(data["info"]["box"]["area_px"])
+        if not (box_area_px > compiled.box_low) and (box_area_px < compiled.box_high):
             Logger.critical("Box area is not in an acceptable range.")
             wrong = True
             error["box"] = {
-                "correct_area_mm": template["info"]["stats"]["mean"]["area_mm"],
-                "error_area_mm": template["info"]["stats"]["error"]["area_mm"],
+                "correct_area_mm": template()["info"]["stats"]["mean"]["area_mm"],
+                "error_area_mm": template()["info"]["stats"]["error"]["area_mm"],
             }
 
         # Checking if there are areas in the template and data
-        if template["info"]["total_areas"] == 0 and data["info"]["total_areas"] == 0:
+        total_areas = compiled.meta["total_areas"]
+        if total_areas == 0 and data["info"]["total_areas"] == 0:
             Logger.critical("Template has no areas and data has no areas.")
             error["is_total_areas_correct"] = True
             if wrong:
                 return error, order
             return None, order
 
-        if template["info"]["total_areas"] == 0 and data["info"]["total_areas"] > 0:
+        if total_areas == 0 and data["info"]["total_areas"] > 0:
             error["is_total_areas_correct"] = False
 
-            for area in data["areas"]:
-                distance_top_left_px_x, distance_top_left_px_y = herons_formula(
-                    area["distance_px"][order[0]],
-                    area["distance_px"][order[3]],
-                    data["info"]["box"]["delta_px"]["y"],
-                )
-
-                cast(list[ErrorAreas], error["areas"]).append(
-                    {
-                        "id": -1,
-                        "kind": "unexpected",
-                        "correct_center_mm": {
-                            "x": distance_top_left_px_x * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y * template["info"]["mm_to_px"],
-                        },
-                        "correct_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x,
-                                "y": distance_top_left_px_y,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "error_center_mm": {
-                            "x": Decimal("0"),
-                            "y": Decimal("0"),
-                        },
-                        "error_center_px": {
-                            "x": 0,
-                            "y": 0,
-                        },
-                        "correct_area_mm": Decimal("0"),
-                        "correct_area_px": Decimal("0"),
-                        "error_area_mm": Decimal("0"),
-                        "error_area_px": Decimal("0"),
-                    }
-                )
+            error["areas"] = [
+                cls.__unexpected_error(area, template(), data, order)
+                for area in data["areas"]
+            ]
 
             Logger.critical("Template has no areas and data has areas.")
             return error, order
 
-        if template["info"]["total_areas"] > 0 and data["info"]["total_areas"] == 0:
+        if total_areas > 0 and data["info"]["total_areas"] == 0:
             wrong = True
             error["is_total_areas_correct"] = False
-            error["areas"] = []
-
-            for area in template["areas"]:
-                distance_top_left_px_x, distance_top_left_px_y = herons_formula(
-                    area["mean"]["distance_px"][order[0]],
-                    area["mean"]["distance_px"][order[3]],
-                    template["info"]["stats"]["mean"]["delta_px"]["y"],
-                )
-                distance_top_left_px_x_error, distance_top_left_px_y_error = (
-                    herons_formula(
-                        area["error"]["distance_px"][order[0]],
-                        area["error"]["distance_px"][order[3]],
-                        template["info"]["stats"]["error"]["delta_px"]["y"],
-                    )
-                )
-
-                cast(list[ErrorAreas], error["areas"]).append(
-                    {
-                        "id": area["id"],
-                        "kind": "unexistent",
-                        "correct_center_mm": {
-                            "x": distance_top_left_px_x * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y * template["info"]["mm_to_px"],
-                        },
-                        "correct_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x,
-                                "y": distance_top_left_px_y,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "error_center_mm": {
-                            "x": distance_top_left_px_x_error
-                            * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y_error
-                            * template["info"]["mm_to_px"],
-                        },
-                        "error_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x_error,
-                                "y": distance_top_left_px_y_error,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "correct_area_mm": area["mean"]["area_mm"],
-                        "correct_area_px": area["mean"]["area_px"],
-                        "error_area_mm": area["error"]["area_mm"],
-                        "error_area_px": area["error"]["area_px"],
-                    }
-                )
+            error["areas"] = [
+                cls.__template_error(area, "unexistent", template(), data, order)
+                for area in template()["areas"]
+            ]
 
             Logger.critical("Template has areas and data has no areas.")
             return error, order
 
-        if template["info"]["total_areas"] < data["info"]["total_areas"]:
+        if total_areas < data["info"]["total_areas"]:
             wrong = True
             error["is_total_areas_correct"] = False
 
             Logger.critical("Template has less areas than data.")
 
         # Getting a reference point and order for the areas
-        data["areas"], order = fix_ids(template["areas"], data["areas"])
-        template["areas"] = sorted(template["areas"], key=lambda x: x["id"])
+        with Timings.stage("fix_ids"):
+            if Matching.ENGINE == "greedy":
+                data["areas"], order = Matching.fix_ids(
+                    template()["areas"], data["areas"]
+                )
+            else:
+                data["areas"], order = Matching.match(
+                    compiled.distance_mean, compiled.ids, data["areas"]
+                )
 
-        print([area["id"] for area in data["areas"]])
-        print([area["id"] for area in template["areas"]])
+        Logger.debug(f"Data ids: {[area['id'] for area in data['areas']]}")
+        Logger.debug(f"Template ids: {compiled.ids.astype(int).tolist()}")
 
         error["info"]["rotate_correction"] = order
 
-        temp_errors: list[ErrorAreas] = []
-        # Checking all areas
-        for new_area in data["areas"]:
-            # Checking if the center mm is in an acceptable range
-
-            if new_area["id"] >= 0:
-                temp: ErrorAreas | None = None
-                area = template["areas"][new_area["id"]]
-                if (
-                    (
-                        new_area["distance_px"][order[0]]
-                        > area["mean"]["distance_px"]["top_left"]
-                        + area["stdev"]["distance_px"]["top_left"] * 3
-                    )
-                    or (
-                        new_area["distance_px"][order[0]]
-                        < area["mean"]["distance_px"]["top_left"]
-                        - area["stdev"]["distance_px"]["top_left"] * 3
-                    )
-                    or (
-                        new_area["distance_px"][order[1]]
-                        > area["mean"]["distance_px"]["top_right"]
-                        + area["stdev"]["distance_px"]["top_right"] * 3
-                    )
-                    or (
-                        new_area["distance_px"][order[1]]
-                        < area["mean"]["distance_px"]["top_right"]
-                        - area["stdev"]["distance_px"]["top_right"] * 3
-                    )
-                ):
-                    Logger.critical(
-                        f"Area {area['id']} is not in an acceptable range for it's"
-                        + " center position."
-                    )
-
-                    distance_top_left_px_x, distance_top_left_px_y = herons_formula(
-                        area["mean"]["distance_px"][order[0]],
-                        area["mean"]["distance_px"][order[3]],
-                        template["info"]["stats"]["mean"]["delta_px"]["y"],
-                    )
+        # * The tolerances of every matched area are checked at once, the errors are
+        # * only built for the areas that failed
+        ids = np.array([area["id"] for area in data["areas"]], dtype=np.int64)
+        matched = ids >= 0
+        rows = np.where(matched, ids, 0)
+        distances = np.array(
+            [
+                [
+                    float(area["distance_px"][order[0]]),
+                    float(area["distance_px"][order[1]]),
+                ]
+                for area in data["areas"]
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
+        areas_px = np.array(
+            [float(area["area_px"]) for area in data["areas"]], dtype=np.float64
+        )
+
+        # Checking if the center and the area are in an acceptable range
+        center = matched & (
+            (distances > compiled.distance_high[rows, :2])
+            | (distances < compiled.distance_low[rows, :2])
+        ).any(axis=1)
+        size = matched & (
+            (areas_px > compiled.area_high[rows]) | (areas_px < compiled.area_low[rows])
+        )
 
-                    distance_top_left_px_x_error, distance_top_left_px_y_error = (
-                        herons_formula(
-                            area["error"]["distance_px"][order[0]],
-                            area["error"]["distance_px"][order[3]],
-                            template["info"]["stats"]["error"]["delta_px"]["y"],
-                        )
-                    )
-
-                    temp = {
-                        "id": area["id"],
-                        "kind": "center",
-                        "correct_center_mm": {
-                            "x": distance_top_left_px_x * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y * template["info"]["mm_to_px"],
-                        },
-                        "correct_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x,
-                                "y": distance_top_left_px_y,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "error_center_mm": {
-                            "x": distance_top_left_px_x_error
-                            * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y_error
-                            * template["info"]["mm_to_px"],
-                        },
-                        "error_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x_error,
-                                "y": distance_top_left_px_y_error,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "correct_area_mm": area["mean"]["area_mm"],
-                        "correct_area_px": area["mean"]["area_px"],
-                        "error_area_mm": area["error"]["area_mm"],
-                        "error_area_px": area["error"]["area_px"],
-                    }
-
-                # Checking if the area mm is in an acceptable range
-                if (
-                    new_area["area_px"]
-                    > area["mean"]["area_px"] + area["stdev"]["area_px"] * 3
-                ) or (
-                    new_area["area_px"]
-                    < area["mean"]["area_px"] - area["stdev"]["area_px"] * 3
-                ):
-                    Logger.critical(
-                        f"Area {area['id']} is not in an acceptable range for it's area"
-                        + " size."
-                    )
-
-                    if temp is None:
-                        distance_top_left_px_x, distance_top_left_px_y = herons_formula(
-                            area["mean"]["distance_px"][order[0]],
-                            area["mean"]["distance_px"][order[3]],
-                            template["info"]["stats"]["mean"]["delta_px"]["y"],
-                        )
-                        distance_top_left_px_x_error, distance_top_left_px_y_error = (
-                            herons_formula(
-                                area["error"]["distance_px"][order[0]],
-                                area["error"]["distance_px"][order[3]],
-                                template["info"]["stats"]["error"]["delta_px"]["y"],
-                            )
-                        )
-
-                        temp = {
-                            "id": area["id"],
-                            "kind": "center",
-                            "correct_center_mm": {
-                                "x": distance_top_left_px_x
-                                * template["info"]["mm_to_px"],
-                                "y": distance_top_left_px_y
-                                * template["info"]["mm_to_px"],
-                            },
-                            "correct_center_px": to_image_reference(
-                                data["info"]["box"]["top_left"],
-                                data["info"]["box"]["bottom_left"],
-                                {
-                                    "x": distance_top_left_px_x,
-                                    "y": distance_top_left_px_y,
-                                },
-                                data["info"]["box"]["delta_px"]["y"],
-                            ),
-                            "error_center_mm": {
-                                "x": distance_top_left_px_x_error
-                                * template["info"]["mm_to_px"],
-                                "y": distance_top_left_px_y_error
-                                * template["info"]["mm_to_px"],
-                            },
-                            "error_center_px": to_image_reference(
-                                data["info"]["box"]["top_left"],
-                                data["info"]["box"]["bottom_left"],
-                                {
-                                    "x": distance_top_left_px_x_error,
-                                    "y": distance_top_left_px_y_error,
-                                },
-                                data["info"]["box"]["delta_px"]["y"],
-                            ),
-                            "correct_area_mm": area["mean"]["area_mm"],
-                            "correct_area_px": area["mean"]["area_px"],
-                            "error_area_mm": area["error"]["area_mm"],
-                            "error_area_px": area["error"]["area_px"],
-                        }
-                    else:
-                        temp["kind"] = "both"
+        temp_errors: list[ErrorAreas] = []
+        for i in np.flatnonzero(~matched | center | size):
+            new_area = data["areas"][i]
+            if not matched[i]:
+                temp_errors.append(
+                    cls.__unexpected_error(new_area, template(), data, order)
+                )
+                continue
 
-            else:
-                distance_top_left_px_x, distance_top_left_px_y = herons_formula(
-                    new_area["distance_px"][order[0]],
-                    new_area["distance_px"][order[3]],
-                    data["info"]["box"]["delta_px"]["y"],
+            area = template()["areas"][new_area["id"]]
+            if center[i]:
+                Logger.critical(
+                    f"Area {area['id']} is not in an acceptable range for it's"
+                    + " center position."
                 )
+            if size[i]:
+                Logger.critical(
+                    f"Area {area['id']} is not in an acceptable range for it's area"
+                    + " size."
+                )
+            temp_errors.append(
+                cls.__template_error(
+                    area,
+                    "both" if center[i] and size[i] else "center",
+                    template(),
+                    data,
+                    order,
+                )
+            )
 
-                temp = {
-                    "id": new_area["id"],
-                    "kind": "unexpected",
-                    "correct_center_mm": {
-                        "x": distance_top_left_px_x * template["info"]["mm_to_px"],
-                        "y": distance_top_left_px_y * template["info"]["mm_to_px"],
-                    },
-                    "correct_center_px": to_image_reference(
-                        data["info"]["box"]["top_left"],
-                        data["info"]["box"]["bottom_left"],
-                        {
-                            "x": distance_top_left_px_x,
-                            "y": distance_top_left_px_y,
-                        },
-                        data["info"]["box"]["delta_px"]["y"],
-                    ),
-                    "error_center_mm": {
-                        "x": Decimal("0"),
-                        "y": Decimal("0"),
-                    },
-                    "error_center_px": {
-                        "x": 0,
-                        "y": 0,
-                    },
-                    "correct_area_mm": Decimal("0"),
-                    "correct_area_px": Decimal("0"),
-                    "error_area_mm": Decimal("0"),
-                    "error_area_px": Decimal("0"),
-                }
-
-            if temp is not None:
-                temp_errors.append(temp)
-
-        if data["info"]["total_areas"] < template["info"]["total_areas"]:
+        if data["info"]["total_areas"] < total_areas:
             error["is_total_areas_correct"] = False
 
-            not_taken = [
-                x
-                for x in range(template["info"]["total_areas"])
-                if x not in [area["id"] for area in data["areas"]]
-            ]
+            not_taken = np.setdiff1d(np.arange(total_areas), ids[matched])
 
             for i in not_taken:
-                distance_top_left_px_x, distance_top_left_px_y = herons_formula(
-                    template["areas"][i]["mean"]["distance_px"][order[0]],
-                    template["areas"][i]["mean"]["distance_px"][order[3]],
-                    template["info"]["stats"]["mean"]["delta_px"]["y"],
-                )
-                distance_top_left_px_x_error, distance_top_left_px_y_error = (
-                    herons_formula(
-                        template["areas"][i]["error"]["distance_px"][order[0]],
-                        template["areas"][i]["error"]["distance_px"][order[3]],
-                        template["info"]["stats"]["error"]["delta_px"]["y"],
-                    )
-                )
-
                 temp_errors.append(
-                    {
-                        "id": template["areas"][i]["id"],
-                        "kind": "unexistent",
-                        "correct_center_mm": {
-                            "x": distance_top_left_px_x * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y * template["info"]["mm_to_px"],
-                        },
-                        "correct_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x,
-                                "y": distance_top_left_px_y,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "error_center_mm": {
-                            "x": distance_top_left_px_x_error
-                            * template["info"]["mm_to_px"],
-                            "y": distance_top_left_px_y_error
-                            * template["info"]["mm_to_px"],
-                        },
-                        "error_center_px": to_image_reference(
-                            data["info"]["box"]["top_left"],
-                            data["info"]["box"]["bottom_left"],
-                            {
-                                "x": distance_top_left_px_x_error,
-                                "y": distance_top_left_px_y_error,
-                            },
-                            data["info"]["box"]["delta_px"]["y"],
-                        ),
-                        "correct_area_mm": template["areas"][i]["mean"]["area_mm"],
-                        "correct_area_px": template["areas"][i]["mean"]["area_px"],
-                        "error_area_mm": template["areas"][i]["error"]["area_mm"],
-                        "error_area_px": template["areas"][i]["error"]["area_px"],
-                    }
+                    cls.__template_error(
+                        template()["areas"][int(i)],
+                        "unexistent",
+                        template(),
+                        data,
+                        order,
+                    )
                 )
 
         if len(temp_errors) > 0 or wrong:
@@ -566,6 +446,112 @@ class Compare:
 
         return None, order
 
+    @classmethod
+    def __template_error(
+        cls,
+        area: BaseArea,
+        kind: Literal["center", "both", "unexistent"],
+        template: BaseData,
+        data: NewData,
+        order: list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]],
+    ) -> ErrorAreas:
+        """Build the error of a template area, where it should be and how big."""
+
+        distance_top_left_px_x, distance_top_left_px_y = herons_formula(
+            area["mean"]["distance_px"][order[0]],
+            area["mean"]["distance_px"][order[3]],
+            template["info"]["stats"]["mean"]["delta_px"]["y"],
+        )
+        distance_top_left_px_x_error, distance_top_left_px_y_error = herons_formula(
+            area["error"]["distance_px"][order[0]],
+            area["error"]["distance_px"][order[3]],
+            template["info"]["stats"]["error"]["delta_px"]["y"],
+        )
+
+        return {
+            "id": area["id"],
+            "kind": kind,
+            "correct_center_mm": {
+                "x": distance_top_left_px_x * template["info"]["mm_to_px"],
+                "y": distance_top_left_px_y * template["info"]["mm_to_px"],
+            },
+            "correct_center_px": to_image_reference(
+                data["info"]["box"]["top_left"],
+                data["info"]["box"]["bottom_left"],
+                {
+                    "x": distance_top_left_px_x,
+                    "y": distance_top_left_px_y,
+                },
+                data["info"]["box"]["delta_px"]["y"],
+            ),
+            "error_center_mm": {
+                "x": distance_top_left_px_x_error * template["info"]["mm_to_px"],
+                "y": distance_top_left_px_y_error * template["info"]["mm_to_px"],
+            },
+            "error_center_px": to_image_reference(
+                data["info"]["box"]["top_left"],
+                data["info"]["box"]["bottom_left"],
+                {
+                    "x": distance_top_left_px_x_error,
+                    "y": distance_top_left_px_y_error,
+                },
+                data["info"]["box"]["delta_px"]["y"],
+            ),
+            "correct_area_mm": area["mean"]["area_mm"],
+            "correct_area_px": area["mean"]["area_px"],
+            "error_area_mm": area["error"]["area_mm"],
+            "error_area_px": area["error"]["area_px"],
+        }
+
+    @classmethod
+    def __unexpected_error(
+        cls,
+        new_area: Area,
+        template: BaseData,
+        data: NewData,
+        order: list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]],
+    ) -> ErrorAreas:
+        """
+        Build the error of a piece area that is not in the template, with the id -1
+        as it has no template area.
+        """
+
+        distance_top_left_px_x, distance_top_left_px_y = herons_formula(
+            new_area["distance_px"][order[0]],
+            new_area["distance_px"][order[3]],
+            data["info"]["box"]["delta_px"]["y"],
+        )
+
+        return {
+            "id": -1,
+            "kind": "unexpected",
+            "correct_center_mm": {
+                "x": distance_top_left_px_x * template["info"]["mm_to_px"],
+                "y": distance_top_left_px_y * template["info"]["mm_to_px"],
+            },
+            "correct_center_px": to_image_reference(
+                data["info"]["box"]["top_left"],
+                data["info"]["box"]["bottom_left"],
+                {
+                    "x": distance_top_left_px_x,
+                    "y": distance_top_left_px_y,
+                },
+                data["info"]["box"]["delta_px"]["y"],
+            ),
+            "error_center_mm": {
+                "x": Decimal("0"),
+                "y": Decimal("0"),
+            },
+            "error_center_px": {
+                "x": 0,
+                "y": 0,
+            },
+            "correct_area_mm": Decimal("0"),
+            "correct_area_px": Decimal("0"),
+            "error_area_mm": Decimal("0"),
+            "error_area_px": Decimal("0"),
+        }
+
     @classmethod
     def __read_json(cls, json_name: str):
         """Read a json file and return it as a dict."""
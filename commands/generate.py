@@ -0,0 +1,54 @@
+from os import makedirs, path
+
+from image_io import ImageIO
+from logger import Logger
+from synthetic import Synthetic
+
+
+class Generate:
+    """The class responsible for writing synthetic plates to disk."""
+
+    @classmethod
+    def run(
+        cls,
+        image_save_file: str,
+        pieces: int,
+        size: tuple[int, int],
+        holes: int,
+        rotation: float,
+        noise: float,
+        missing: int,
+        extra: int,
+        seed: int,
+    ):
+        """
+        Run the generate command, writing the plates as '<name>_{01-NN}.<ext>', the
+        names the train command expects, or to the file itself for a single piece.
+        Each piece uses the next seed, so they differ like pieces of the same line.
+        """
+
+        Logger.debug("Running generate command.")
+
+        if not ImageIO.is_image(image_save_file):
+            # ! ERROR CODE 4
+            Logger.err_exit(f"{image_save_file} is not a supported image.", code=4)
+
+        directory = path.dirname(image_save_file)
+        if directory != "":
+            makedirs(directory, exist_ok=True)
+
+        pieces = max(pieces, 1)
+        for i in range(pieces):
+            image = Synthetic.plate(
+                size, holes, rotation, noise, missing, extra, seed + i
+            )
+            name, extension = path.splitext(image_save_file)
+            image_file = (
+                image_save_file if pieces == 1 else f"{name}_{i + 1:02d}{extension}"
+            )
+            if not ImageIO.write(image_file, image):
+                # ! ERROR CODE 6
+                Logger.err_exit(f"OPENCV | Unable to read/write {image_file}.", code=6)
+            Logger.info(f"Plate written to {image_file}.")
+
+        Logger.info("Generate command finished.")
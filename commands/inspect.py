@@ -0,0 +1,82 @@
+from datetime import datetime
+from os import path
+
+from .capture import Capture
+from .compare import Compare
+from .process import Process
+
+from debug_images import DebugImages
+from image_io import ImageIO
+from logger import Logger
+from self_types import Errors
+from timings import Timings
+
+
+class Inspect:
+    """
+    The class responsible for inspecting a piece end to end, passing the frame and the
+    piece data in memory from the capture to the process, compare and correct, so only
+    the results asked for are written to the disk.
+    """
+
+    @classmethod
+    def run(
+        cls,
+        template_file: str,
+        json_file: str | None = None,
+        image_save_file: str | None = None,
+        read_image: str | None = None,
+    ) -> Errors | None:
+        """
+        Run the inspect command.
+
+        Parameters
+        ----------
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+        json_file : str | None
+            Path and only name to write the piece data and errors JSON to, without the
+            .json extension, not written if None.
+        image_save_file : str | None
+            File to save the image with the errors to, not written if None.
+        read_image : str | None
+            Image to inspect instead of grabbing one from the camera.
+
+        Returns
+        -------
+        Errors | None
+            The errors found, None if the piece is correct.
+        """
+
+        Logger.debug("Running inspect command.")
+
+        if json_file is not None:
+            piece = path.basename(json_file)
+        elif read_image is not None:
+            piece = path.splitext(path.basename(read_image))[0]
+        else:
+            piece = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        DebugImages.start_piece(piece)
+
+        with Timings.piece(piece):
+            if read_image is None:
+                frame = Capture.grab()
+            else:
+                if not path.isfile(read_image):
+                    # ! ERROR CODE 5
+                    Logger.err_exit(f"{read_image} not found.", code=5)
+                with Timings.stage("decode"):
+                    frame = ImageIO.read(read_image)
+                if frame is None:
+                    # ! ERROR CODE 6
+                    Logger.err_exit(
+                        f"OPENCV | Unable to read/write {read_image}.", code=6
+                    )
+
+            data = Process.run_frame(frame, json_file, template_file=template_file)
+            errors = Compare.run_frame(
+                data, frame, template_file, json_file, image_save_file
+            )
+
+        Logger.info("Inspect command finished.")
+        return errors
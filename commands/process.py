@@ -7,8 +7,15 @@ import cv2 as cv
 import numpy as np
 from cv2.typing import MatLike
 
+from compiled_template import CompiledTemplate
+from debug_images import DebugImages
+from geometry import corner_distances, to_decimal
+from image_io import ImageIO
 from logger import Logger
 from self_types import NewData
+from station import Station
+from template_journal import TemplateJournal
+from timings import Timings
 from utils import DecimalEncoder, pitagoras_distance
 
 
@@ -22,135 +29,460 @@ class Process:
     MM_PER_PIXEL_SQUARE = Decimal(getenv("MM_PER_PIXEL_SQUARE", "0.1979")) ** 2
     CANNY_THRESHOLD_LOW = 255
     CANNY_THRESHOLD_HIGH = 255
+    # "components" labels every region once, "floodfill" fills one region per contour
+    AREA_ENGINE = getenv("AREA_ENGINE", "components")
+    # "canny" traces the Canny edge bands, "binary" traces the binary image directly
+    EXTRACTION_MODE = getenv("EXTRACTION_MODE", "canny")
+    # Downscale factor to locate the piece on before measuring it at full resolution,
+    # 0 or 1 to locate it on the full image
+    PYRAMID_FACTOR = int(getenv("PYRAMID_FACTOR", "0"))
+    # Margin in pixels around the located piece measured at full resolution, on top of
+    # the two downscaled pixels the located edges can be off by
+    PYRAMID_BAND = int(getenv("PYRAMID_BAND", "8"))
+    # 1 to drop the contours that can not be template holes before measuring them when
+    # a template is given, 0 to measure every contour
+    FILTER_TEMPLATE = int(getenv("FILTER_TEMPLATE", "0"))
+    # Fraction of the smallest template hole area below which a contour is dust, far
+    # under it so the extra holes the compare flags are kept
+    FILTER_DUST = float(getenv("FILTER_DUST", "0.1"))
+
+    # * Buffers reused between pieces of the same size when running as a server
+    __buffers: dict[str, MatLike] = {}
 
     @classmethod
-    def run(cls, read_image: str, json_file: str):
-        """Run the process command."""
+    def run(
+        cls, read_image: str, json_file: str, template_file: str | None = None
+    ) -> NewData:
+        """
+        Run the process command, returning the data written to the JSON. With a
+        template and FILTER_TEMPLATE, the dust and the contours outside the piece are
+        dropped before being measured.
+        """
 
         Logger.debug("Running process command.")
         Logger.debug(f"MM_PER_PIXEL: {cls.MM_PER_PIXEL}")
+        Logger.debug(f"AREA_ENGINE: {cls.AREA_ENGINE}")
+        Logger.debug(f"EXTRACTION_MODE: {cls.EXTRACTION_MODE}")
+        Logger.debug(f"PYRAMID_FACTOR: {cls.PYRAMID_FACTOR}")
+
+        piece = path.splitext(path.basename(read_image))[0]
+        DebugImages.start_piece(piece)
+
+        with Timings.piece(piece):
+            image = cls.load(read_image)
+            result = cls.run_frame(image, json_file, True, template_file)
+
+        Logger.info("Process command finished.")
+        return result
+
+    @classmethod
+    def run_frame(
+        cls,
+        frame: MatLike,
+        json_file: str | None = None,
+        prepared: bool = False,
+        template_file: str | None = None,
+    ) -> NewData:
+        """
+        Get the data of the piece in a frame in memory, like the process command.
+
+        Parameters
+        ----------
+        frame : MatLike
+            The whole image, in grey or colour.
+        json_file : str | None
+            Path and only name to write the data to, without the .json extension, not
+            written if None.
+        prepared : bool
+            If the frame is already the binary ROI given by prepare.
+        template_file : str | None
+            Path and only name of the template JSON, without the .json extension, to
+            drop the contours that can not be one of its holes if FILTER_TEMPLATE.
+
+        Returns
+        -------
+        NewData
+            The data of the piece.
+        """
+
+        image = frame if prepared else cls.prepare(frame)
+        box, contours = cls.extract(image)
+        if template_file is not None and cls.FILTER_TEMPLATE:
+            with Timings.stage("filter"):
+                contours = cls.__filter_contours(
+                    box, contours, cls.__get_dust(template_file)
+                )
+        result = cls.measure(image, box, contours)
+
+        if json_file is not None:
+            with Timings.stage("json_write"):
+                cls.__save_json(f"{json_file}.json", result)
+
+        return result
 
-        if not read_image.endswith(".png"):
+    @classmethod
+    def load(cls, read_image: str) -> MatLike:
+        """
+        Read the image, crop it to the ROI of the station and binarise it.
+
+        Returns
+        -------
+
+        MatLike
+            The cropped binary image.
+        """
+
+        if not ImageIO.is_image(read_image):
             # ! ERROR CODE 4
-            Logger.err_exit(f"{read_image} is not PNG.", code=4)
+            Logger.err_exit(f"{read_image} is not a supported image.", code=4)
 
         if not path.isfile(read_image):
             # ! ERROR CODE 5
             Logger.err_exit(f"{read_image} not found.", code=5)
 
-        image = cv.imread(read_image, cv.IMREAD_GRAYSCALE)
+        # * A .npy is memory mapped, so only the ROI is read from the disk
+        with Timings.stage("decode"):
+            image = ImageIO.read(read_image)
         if image is None:
             # ! ERROR CODE 6
             Logger.err_exit(f"OPENCV | Unable to read/write {read_image}.", code=6)
 
+        return cls.prepare(image)
+
+    @classmethod
+    def prepare(cls, image: MatLike) -> MatLike:
+        """
+        Crop the image to the ROI of the station and binarise it.
+
+        Returns
+        -------
+
+        MatLike
+            The cropped binary image.
+        """
+
+        # * Cropping first keeps the threshold and its histogram to the ROI only
+        image = Station.ROI.crop(image)
+        if image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        elif image.ndim == 3:
+            image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
         # * For debugging purposes
-        _, image = cv.threshold(image, 0, 255, cv.THRESH_BINARY | cv.THRESH_OTSU)
-        cv.imwrite("./images/output/original.png", image)
+        DebugImages.write("original.png", image)
 
-        image = image[1200 : 1200 + 4900, 2000 : 2000 + 5200]
-        cv.imwrite("./images/output/cropped.png", image)
+        with Timings.stage("threshold"):
+            _, image = cv.threshold(image, 0, 255, cv.THRESH_BINARY | cv.THRESH_OTSU)
+        DebugImages.write("cropped.png", image)
         # ? Still got to decide if we're going to use Gaussian Blur or not
         # image = cv.GaussianBlur(image, (5, 5), 0)
 
-        box, canny = cls.__get_min_area_rect(image)
+        return image
 
-        # * For debugging purposes
-        cv.imwrite("./images/output/outputcanny.png", canny)
-        cv.imwrite("./images/output/outputimage.png", image)
+    @classmethod
+    def extract(
+        cls, image: MatLike, mode: str | None = None, pyramid: int | None = None
+    ) -> Tuple[MatLike, list[MatLike]]:
+        """
+        Get the minimum area rectangle of the piece and the contours of its holes.
+
+        Parameters
+        ----------
+        image : MatLike
+            The cropped binary image.
+        mode : str | None
+            "canny" to trace the edges found by Canny, "binary" to trace the binary
+            image directly, defaults to EXTRACTION_MODE.
+        pyramid : int | None
+            Downscale factor to locate the piece on, so the holes are only searched
+            inside its bounding rectangle, defaults to PYRAMID_FACTOR.
 
-        contours = cls.__get_contours(canny, box)
+        Returns
+        -------
 
-        Logger.debug(f"Box points: {box[0]}, {box[1]}, {box[2]}, {box[3]}.")
-        box = cls.__sort_box_points(box)
-        Logger.debug(f"Sorted box points: {box[0]}, {box[1]}, {box[2]}, {box[3]}.")
+        MatLike
+            The rectangle enclosing points.
+        list[MatLike]
+            The contours of the holes sorted in biggest to smallest.
+        """
 
-        # * For debugging purposes
-        cv.imwrite("./images/output/output1.png", image)
+        mode = mode or cls.EXTRACTION_MODE
+        pyramid = cls.PYRAMID_FACTOR if pyramid is None else pyramid
 
-        result = cls.__get_areas(image, contours[2:], box)
+        x, y, w, h = 0, 0, image.shape[1], image.shape[0]
+        if pyramid > 1:
+            with Timings.stage("locate"):
+                located_box = cls.__locate_piece(image, pyramid)
+            # The band covers the error of the coarse edges
+            x, y, w, h = cls.__get_region(
+                located_box, image, cls.PYRAMID_BAND + 2 * pyramid
+            )
+        region = image[y : y + h, x : x + w]
 
-        cls.__save_json(f"{json_file}.json", result)
+        if mode == "binary":
+            with Timings.stage("edges"):
+                foreground = cls.__get_foreground(region)
+            box, contours = cls.__get_contours(foreground, bands=False, offset=(x, y))
+        else:
+            with Timings.stage("edges"):
+                canny = cls.__get_edges(region)
 
-        Logger.info("Process command finished.")
+            # * For debugging purposes
+            DebugImages.write("outputcanny.png", canny)
+            DebugImages.write("outputimage.png", image)
+
+            box, contours = cls.__get_contours(canny, bands=True, offset=(x, y))
+
+        # * The box is taken from the region traced in the mode, not the located one,
+        # * so the pieces measure the same with and without the pyramid
+        return box, contours
+
+    @classmethod
+    def measure(cls, image: MatLike, box: MatLike, contours: list[MatLike]) -> NewData:
+        """Get the box and holes information of the piece."""
+
+        Logger.debug(f"Box points: {box[0]}, {box[1]}, {box[2]}, {box[3]}.")
+        with Timings.stage("box"):
+            sorted_box = cls.__sort_box_points(box)
+        Logger.debug(
+            f"Sorted box points: {sorted_box[0]}, {sorted_box[1]}, {sorted_box[2]}, "
+            + f"{sorted_box[3]}."
+        )
+
+        # * For debugging purposes
+        DebugImages.write("output1.png", image)
+
+        with Timings.stage("areas"):
+            return cls.__get_areas(image, contours, sorted_box)
 
     @classmethod
-    def __get_min_area_rect(cls, image: MatLike) -> Tuple[MatLike, MatLike]:
+    def __locate_piece(cls, image: MatLike, factor: int) -> MatLike:
         """
-        Get the minimum area rectangle of the biggest contour of an image and put it in
-        the image.
+        Get the minimum area rectangle of the piece found on the image downscaled by
+        the factor, in full resolution coordinates. Its edges are off by up to a
+        downscaled pixel.
 
         Returns
         -------
 
         MatLike
             The rectangle enclosing points.
+        """
+
+        Logger.info(f"Locating piece on the image downscaled by {factor}.")
+
+        # * The image is binary, so sampling every factor pixels is enough
+        small = np.ascontiguousarray(image[::factor, ::factor])
+        inverted = cls.__is_background_white(small)
+        if inverted:
+            small = cv.bitwise_not(small)
+
+        contours, _ = cv.findContours(small, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        if len(contours) == 0:
+            # ! ERROR CODE 7
+            Logger.err_exit("No piece found.", code=7)
+
+        box = cv.boxPoints(cv.minAreaRect(max(contours, key=cv.contourArea)))
+
+        return cast(MatLike, cast(np.ndarray, box) * factor)
+
+    @classmethod
+    def __get_region(
+        cls, points: MatLike, image: MatLike, margin: int
+    ) -> Tuple[int, int, int, int]:
+        """
+        Get the bounding rectangle of the points grown by the margin, clipped to the
+        image, as x, y, width and height.
+        """
+
+        points = np.asarray(points).reshape(-1, 2)
+        x0 = max(int(np.floor(points[:, 0].min())) - margin, 0)
+        y0 = max(int(np.floor(points[:, 1].min())) - margin, 0)
+        x1 = min(int(np.ceil(points[:, 0].max())) + margin + 1, image.shape[1])
+        y1 = min(int(np.ceil(points[:, 1].max())) + margin + 1, image.shape[0])
+
+        return x0, y0, max(x1 - x0, 0), max(y1 - y0, 0)
+
+    @classmethod
+    def __is_background_white(cls, image: MatLike) -> bool:
+        """If most of the binary image border is white."""
+
+        border = np.concatenate((image[0], image[-1], image[:, 0], image[:, -1]))
+
+        return np.count_nonzero(border) * 2 > len(border)
+
+    @classmethod
+    def __get_foreground(cls, image: MatLike) -> MatLike:
+        """
+        Get the binary image with the piece in white, the background colour is the one
+        of most of the image border.
+        """
+
+        if cls.__is_background_white(image):
+            return cv.bitwise_not(image)
+
+        return image
+
+    @classmethod
+    def __get_edges(cls, image: MatLike) -> MatLike:
+        """
+        Get the edges of the image as closed bands, so every border is traced by two
+        contours, one on each side of the band.
+
+        Returns
+        -------
+
         MatLike
-            The canny edge detection of the image wihout the rectangle.
+            The canny edge detection of the image.
         """
 
-        Logger.info("Getting minimum area rectangle.")
+        Logger.info("Getting edges of image.")
 
-        # Get the edges of the image
         canny = cv.Canny(image, cls.CANNY_THRESHOLD_LOW, cls.CANNY_THRESHOLD_HIGH)
         kernel = np.ones((2, 2), np.uint8)
         canny = cv.morphologyEx(canny, cv.MORPH_GRADIENT, kernel)
-        # Get the contours of the image
-        contours, _ = cv.findContours(canny, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE)
 
-        # Sort contours
-        contours = sorted(contours, key=cv.contourArea, reverse=True)
+        return canny
+
+    @classmethod
+    def __get_contours(
+        cls, edges: MatLike, bands: bool, offset: Tuple[int, int] = (0, 0)
+    ) -> Tuple[MatLike, list[MatLike]]:
+        """
+        Get the minimum area rectangle of the piece and the contours of its holes with
+        a single contour extraction, using the hierarchy to find the piece outline and
+        the holes inside it.
+
+        If the edges are bands, every border is traced twice and the inner border of
+        the outline band is skipped. The offset is added to every contour point, for
+        edges of a region of the image.
+
+        Returns
+        -------
+
+        MatLike
+            The rectangle enclosing points.
+        list[MatLike]
+            The contours of the holes sorted in biggest to smallest.
+        """
+
+        Logger.info("Getting contours of image.")
+
+        with Timings.stage("contours"):
+            contours, hierarchy = cv.findContours(
+                edges, cv.RETR_TREE, cv.CHAIN_APPROX_SIMPLE, offset=offset
+            )
 
-        if len(contours) <= 1:
+        if len(contours) == 0:
             # ! ERROR CODE 7
             Logger.err_exit("No piece found.", code=7)
 
+        # * [next, previous, first child, parent] of each contour
+        hierarchy = hierarchy[0]
+        areas = [cv.contourArea(contour, oriented=True) for contour in contours]
+
+        # The piece outline is the biggest contour
+        outline = max(range(len(contours)), key=lambda i: abs(areas[i]))
+
         # Get the minimum area rectangle
-        rect = cv.minAreaRect(contours[0])
+        with Timings.stage("box"):
+            rect = cv.minAreaRect(contours[outline])
 
-        # Get the points of the rectangle
-        box = cv.boxPoints(rect)
+            # Get the points of the rectangle
+            box = cv.boxPoints(rect)
         box = cast(np.ndarray, box)
         box = np.int_(box)
         box = cast(MatLike, box)
 
-        # cv.drawContours(image, [box], 0, (0, 0, 0), 10)
-
         if len(box) != 4:
             # ! ERROR CODE 8
             Logger.err_exit("No min area rect found.", code=8)
 
-        return box, canny
+        # The outline band has an inner border hugging it, its biggest child
+        children = cls.__get_children(hierarchy, outline)
+        band = -1
+        if bands:
+            band = max(children, key=lambda i: abs(areas[i]), default=-1)
+
+        # The holes are the contours inside the piece traced in the opposite
+        # direction of the outline, so each hole band is measured once
+        holes: list[int] = []
+        pending = children
+        while len(pending) > 0:
+            i = pending.pop()
+            pending.extend(cls.__get_children(hierarchy, i))
+
+            if i != band and areas[i] * areas[outline] <= 0:
+                holes.append(i)
+
+        holes = sorted(holes, key=lambda i: abs(areas[i]), reverse=True)
+
+        return box, [contours[i] for i in holes]
 
     @classmethod
-    def __get_contours(cls, canny: MatLike, box: MatLike) -> list[MatLike]:
+    def __get_dust(cls, template_file: str) -> float | None:
         """
-        Get the contours of the image and return then sorted.
+        Get the dust area in pixels of the template, FILTER_DUST of its smallest hole
+        within 3 standard deviations. There is no upper bound, a hole bigger than
+        every template hole is an error for the compare to flag.
 
         Returns
         -------
+        float | None
+            The area under which a contour is dust, None if the template has no holes.
+        """
 
-        list[MatLike]
-            The contours sorted in biggest to smallest.
+        with TemplateJournal.lock(template_file, shared=True):
+            compiled = CompiledTemplate.load(template_file)
+        if len(compiled.areas) == 0:
+            return None
+
+        return float(compiled.area_low.min()) * cls.FILTER_DUST
 
+    @classmethod
+    def __filter_contours(
+        cls,
+        box: MatLike,
+        contours: list[MatLike],
+        dust: float | None,
+    ) -> list[MatLike]:
+        """
+        Drop the contours with an area under the dust area or outside the piece box,
+        like dust and edge noise, before their areas are measured.
         """
 
-        Logger.info("Getting contours of image.")
+        if dust is None:
+            return contours
 
-        # canny = cv.drawContours(canny, [box], 0, (255, 255, 255), 23)
-        # canny = cv.rectangle(
-        #     canny,
-        #     (box[0][0], box[0][1]),
-        #     (box[2][0], box[2][1]),
-        #     0,
-        #     int(Decimal("1.6") // cls.MM_PER_PIXEL),
-        # )
-        contours, _ = cv.findContours(canny, cv.RETR_LIST, cv.CHAIN_APPROX_SIMPLE)
-        contours = sorted(contours, key=cv.contourArea, reverse=True)
+        polygon = np.asarray(box, dtype=np.float32).reshape(-1, 1, 2)
+        kept: list[MatLike] = []
+        for contour in contours:
+            if cv.contourArea(contour) < dust:
+                continue
+            point = contour[0][0]
+            if (
+                cv.pointPolygonTest(polygon, (float(point[0]), float(point[1])), False)
+                < 0
+            ):
+                continue
+            kept.append(contour)
 
-        # * For debugging purposes
-        cv.imwrite("./images/output/output2.png", canny)
+        Logger.debug(
+            f"Dropped {len(contours) - len(kept)} contours out of the template."
+        )
 
-        return contours
+        return kept
+
+    @classmethod
+    def __get_children(cls, hierarchy: MatLike, parent: int) -> list[int]:
+        """Get the indexes of the direct children of a contour in the hierarchy."""
+
+        children: list[int] = []
+        child = hierarchy[parent][2]
+        while child != -1:
+            children.append(int(child))
+            child = hierarchy[child][0]
+
+        return children
 
     @classmethod
     def __sort_box_points(cls, box: MatLike) -> list[list[int]]:
@@ -217,18 +549,24 @@ class Process:
             },
             "areas": [],
         }
-        count = 0
+        centers: list[Tuple[int, int]] = []
+        totals: list[int] = []
 
         # * For debugging purposes
-        white = np.zeros((image.shape[0], image.shape[1], 3), dtype=np.uint8)
-        white.fill(255)
+        white = None
+        if DebugImages.enabled():
+            white = np.zeros((image.shape[0], image.shape[1], 3), dtype=np.uint8)
+            white.fill(255)
 
-        for contour in contours:
-            area = cv.contourArea(contour, oriented=True)
+        # * The holes are inside the piece, so only its bounding rectangle is measured
+        x, y, w, h = cls.__get_region(np.array(box), image, 2)
+        region = image[y : y + h, x : x + w]
 
-            if area < 0:
-                continue
+        # * Labels of each colour of the binary image, computed on first use
+        components: dict[int, Tuple[MatLike, MatLike]] = {}
+        measured: set[Tuple[int, int]] = set()
 
+        for contour in contours:
             m = cv.moments(contour)
 
             if m["m00"] == 0:
@@ -237,11 +575,29 @@ class Process:
             cx = int(m["m10"] / m["m00"])
             cy = int(m["m01"] / m["m00"])
 
-            mask = np.zeros((image.shape[0] + 2, image.shape[1] + 2), dtype=np.uint8)
+            if not (0 <= cx - x < w and 0 <= cy - y < h):
+                Logger.debug(f"Center ({cx}, {cy}) outside of the piece, skipping.")
+                continue
 
-            total, _, _, _ = cv.floodFill(
-                image, mask, (cx, cy), (0, 0, 0), (0, 0, 0), (0, 0, 0)
-            )
+            if cls.AREA_ENGINE == "floodfill":
+                mask = np.zeros((h + 2, w + 2), dtype=np.uint8)
+
+                total, _, _, _ = cv.floodFill(
+                    region, mask, (cx - x, cy - y), (0, 0, 0), (0, 0, 0), (0, 0, 0)
+                )
+            else:
+                colour = int(region[cy - y, cx - x])
+                if colour not in components:
+                    components[colour] = cls.__get_components(region, colour)
+                labels, stats = components[colour]
+
+                label = int(labels[cy - y, cx - x])
+                if (colour, label) in measured:
+                    # The region was already measured through another contour
+                    continue
+                measured.add((colour, label))
+
+                total = int(stats[label, cv.CC_STAT_AREA])
 
             # * For debugging purposes
             # if count == 0:
@@ -250,61 +606,37 @@ class Process:
             #         "./images/output/outputmask.png", (mask * 255).astype(np.uint8)
             #     )
 
-            cv.circle(white, (cx, cy), 3, (0, 0, 0), -1)
-
-            distance_px = {
-                "top_left": pitagoras_distance(cx, box[0][0], cy, box[0][1]),
-                "top_right": pitagoras_distance(cx, box[1][0], cy, box[1][1]),
-                "bottom_right": pitagoras_distance(cx, box[2][0], cy, box[2][1]),
-                "bottom_left": pitagoras_distance(cx, box[3][0], cy, box[3][1]),
-            }
-
-            # * Calculating the distance_top_left_px[x] using Herons formula to get the
-            # * triangle area so we can calculate the height
-            # * (the distance_top_left_px[x]).
+            if white is not None:
+                cv.circle(white, (cx, cy), 3, (0, 0, 0), -1)
 
-            # * semi_perimeter = (
-            # *     distance_px["top_left"] + distance_px["bottom_left"] + delta_y_box
-            # * ) / 2
+            centers.append((cx, cy))
+            totals.append(total)
 
-            # * triangle_area = (
-            # *     semi_perimeter
-            # *     * (semi_perimeter - distance_px["top_left"])
-            # *     * (semi_perimeter - distance_px["bottom_left"])
-            # *     * (semi_perimeter - delta_y_box)
-            # * ).sqrt()
+        count = len(totals)
 
-            # * distance_top_left_px_x = triangle_area * 2 / delta_y_box
-
-            # * distance_top_left_px_y = (
-            # *     pow(distance_px["top_left"], 2) - pow(distance_top_left_px_x, 2)
-            # * ).sqrt()
+        # * All the distances are calculated at once as floats and only converted to
+        # * Decimal for the JSON
+        distances_px = corner_distances(np.array(centers).reshape(-1, 2), np.array(box))
+        distances_mm = distances_px * float(cls.MM_PER_PIXEL)
+        corners = ["top_left", "top_right", "bottom_right", "bottom_left"]
+        columns_px = [to_decimal(distances_px[:, i]) for i in range(4)]
+        columns_mm = [to_decimal(distances_mm[:, i]) for i in range(4)]
 
+        for i, total in enumerate(totals):
             result["areas"].append(
                 {
-                    "id": count,
+                    "id": i,
                     "area_mm": total * cls.MM_PER_PIXEL_SQUARE,
                     "area_px": total,
-                    "distance_px": distance_px,
+                    "distance_px": {
+                        corner: columns_px[j][i] for j, corner in enumerate(corners)
+                    },
                     "distance_mm": {
-                        "top_left": distance_px["top_left"] * cls.MM_PER_PIXEL,
-                        "top_right": distance_px["top_right"] * cls.MM_PER_PIXEL,
-                        "bottom_right": distance_px["bottom_right"] * cls.MM_PER_PIXEL,
-                        "bottom_left": distance_px["bottom_left"] * cls.MM_PER_PIXEL,
+                        corner: columns_mm[j][i] for j, corner in enumerate(corners)
                     },
-                    # "distance_top_left_px": {
-                    #     "x": distance_top_left_px_x,
-                    #     "y": distance_top_left_px_y,
-                    # },
-                    # "distance_top_left_mm": {
-                    #     "x": distance_top_left_px_x * cls.MM_PER_PIXEL,
-                    #     "y": distance_top_left_px_y * cls.MM_PER_PIXEL,
-                    # },
                 }
             )
 
-            count += 1
-
         result["info"]["total_areas"] = count
 
         Logger.debug(f"Area count: {count}.")
@@ -312,9 +644,57 @@ class Process:
         result = cast(NewData, result)
 
         # * For debugging purposes
-        cv.imwrite("./images/output/outputwhite.png", white)
+        if white is not None:
+            DebugImages.write("outputwhite.png", white)
         return result
 
+    @classmethod
+    def __get_components(cls, image: MatLike, colour: int) -> Tuple[MatLike, MatLike]:
+        """
+        Label all the 4-connected regions of the given colour in the binary image at
+        once, so each region's pixel count is the same a flood fill from any of its
+        points would give.
+
+        Returns
+        -------
+
+        MatLike
+            The label of each pixel, 0 for pixels of the other colour.
+        MatLike
+            The stats of each label, indexed by the label.
+        """
+
+        Logger.debug(f"Labeling regions of colour {colour}.")
+
+        binary = image
+        if colour == 0:
+            binary = cv.bitwise_not(image, dst=cls.__get_buffer("inverted", image))
+        _, labels, stats, _ = cv.connectedComponentsWithStats(
+            binary,
+            labels=cls.__get_buffer(f"labels_{colour}", image, np.int32),
+            connectivity=4,
+            ltype=cv.CV_32S,
+        )
+
+        return labels, stats
+
+    @classmethod
+    def __get_buffer(
+        cls, name: str, image: MatLike, dtype: type = np.uint8
+    ) -> np.ndarray:
+        """
+        Get a buffer the size of the image, allocated only if no previous buffer was
+        big enough.
+        """
+
+        size = image.shape[0] * image.shape[1]
+        buffer = cls.__buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = np.empty(size, dtype=dtype)
+            cls.__buffers[name] = buffer
+
+        return buffer[:size].reshape(image.shape[:2])
+
     @classmethod
     def __save_json(cls, json_file: str, result: NewData):
         """Save the result to a json file."""
@@ -0,0 +1,160 @@
+import os
+import signal
+import sys
+from contextlib import redirect_stdout
+from json import dumps, loads
+from socketserver import StreamRequestHandler, UnixStreamServer
+from time import perf_counter
+from typing import Any, Callable, TextIO
+
+from args_parser import Args
+from logger import Logger
+from utils import DecimalEncoder
+
+
+class Serve:
+    """
+    The class responsible for running the commands as a long-running server, so the
+    imports, parsed templates and buffers are kept warm between pieces.
+
+    Each request is a JSON object in a single line, with the mode and the same
+    arguments as the command line (image_save_file, read_image, json_file, template
+    and wait), and is answered with a JSON line holding the error code, the duration
+    and the result of the command.
+    """
+
+    MODES = ("capture", "process", "train", "compare", "benchmark", "inspect")
+    REQUEST_FIELDS = {
+        "mode": "mode",
+        "image_save_file": "image_save_file",
+        "read_image": "read_image",
+        "json_file": "json_file",
+        "template": "template_file",
+        "template_file": "template_file",
+        "wait": "wait",
+    }
+
+    @classmethod
+    def run(cls, args: Args, command: Callable[[Args], Any]):
+        """
+        Run the serve command, answering requests from the UNIX socket if given or from
+        stdin otherwise until it is closed.
+
+        Parameters
+        ----------
+        args : Args
+            The server arguments, the requests arguments are applied over them.
+        command : Callable[[Args], Any]
+            The function running a command from its arguments.
+        """
+
+        Logger.debug("Running serve command.")
+
+        # * Stop cleanly when the service manager terminates the server
+        signal.signal(signal.SIGTERM, cls.__stop)
+
+        if args.socket is None:
+            Logger.info("Serving requests from stdin.")
+            cls.__serve_stream(args, command, sys.stdin, sys.stdout)
+            return
+
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+        handle = cls.__handle
+
+        class Handler(StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    response = handle(args, command, line.decode("utf-8"))
+                    if response is not None:
+                        self.wfile.write(f"{response}\n".encode("utf-8"))
+                        self.wfile.flush()
+
+        try:
+            with UnixStreamServer(args.socket, Handler) as server:
+                Logger.info(f"Serving requests on {args.socket}.")
+                server.serve_forever()
+        except KeyboardInterrupt:
+            Logger.info("Server stopped.")
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 17
+            Logger.err_exit(f"Unable to serve on {args.socket}.", code=17)
+        finally:
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+
+    @classmethod
+    def __stop(cls, *_):
+        """Signal handler stopping the server the same way as Ctrl+C."""
+
+        raise KeyboardInterrupt()
+
+    @classmethod
+    def __serve_stream(
+        cls,
+        args: Args,
+        command: Callable[[Args], Any],
+        requests: TextIO,
+        responses: TextIO,
+    ):
+        """Answer the requests of a stream, one line each, until it is closed."""
+
+        try:
+            for line in requests:
+                # * Anything printed by the commands must not mix with the responses
+                with redirect_stdout(sys.stderr):
+                    response = cls.__handle(args, command, line)
+                if response is not None:
+                    responses.write(f"{response}\n")
+                    responses.flush()
+        except KeyboardInterrupt:
+            Logger.info("Server stopped.")
+
+    @classmethod
+    def __handle(
+        cls, args: Args, command: Callable[[Args], Any], line: str
+    ) -> str | None:
+        """Run the command of a request line and get the response line."""
+
+        if line.strip() == "":
+            return None
+
+        start = perf_counter()
+        request: dict[str, Any] = {}
+        code = 0
+        result = None
+        try:
+            request = loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request is not a JSON object.")
+            request_args = args._replace(
+                **{
+                    field: request[key]
+                    for key, field in cls.REQUEST_FIELDS.items()
+                    if key in request
+                }
+            )
+            if request_args.mode not in cls.MODES:
+                raise ValueError(f"Unknown mode {request_args.mode}.")
+            Logger.debug(f"Request: {str(request_args)}")
+            result = command(request_args)
+        except SystemExit as error:
+            code = error.code if isinstance(error.code, int) else 1
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 18
+            Logger.critical(f"18 - Invalid request: {error}")
+            code = 18
+
+        return dumps(
+            {
+                "id": request.get("id"),
+                "code": code,
+                "seconds": perf_counter() - start,
+                "result": result,
+            },
+            ensure_ascii=False,
+            cls=DecimalEncoder,
+        )
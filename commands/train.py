@@ -1,15 +1,25 @@
 from decimal import Decimal
-from json import dump, load
-from os import path
+from json import dumps, load
+from os import path, remove
 from typing import Literal
 
 from logger import Logger
+from matching import Matching
 from self_types import Area, BaseArea, BaseData, BaseInfo, Info, NewData
-from utils import DecimalEncoder, fix_ids, object_hook_decimal
+from utils import (
+    DecimalEncoder,
+    atomic_write,
+    object_hook_decimal,
+    template_journal_file,
+    template_lock,
+)
 
 
 class Train:
 
+    # * Number of pieces a template is trained from
+    PIECES = 10
+
     # PX_ARTIFICIAL_ERROR = 16
     # CANTOR_ARTIFICIAL_ERROR = (160**2) // 2
 
@@ -33,7 +43,7 @@ class Train:
             "bottom_left",
         ]
 
-        for i in range(1, 11):
+        for i in range(1, cls.PIECES + 1):
             file = f"{json_file}_{i:02d}.json"
             if not path.isfile(file):
                 # ! ERROR CODE 10
@@ -202,26 +212,43 @@ class Train:
                 )
 
             Logger.info("Correcting id for the new data")
-            data["areas"], order = fix_ids(base["areas"], data["areas"])
+            data["areas"], order = Matching.fix_ids(base["areas"], data["areas"])
             base["areas"] = sorted(base["areas"], key=lambda x: x["id"])
 
+            # * An area with no match gets the id -1, which would index the last one
+            unmatched = [area for area in data["areas"] if area["id"] < 0]
+            if len(unmatched) > 0:
+                # ! ERROR CODE 21
+                Logger.err_exit(
+                    f"Areas of {file} do not match the template, {len(unmatched)}"
+                    + " without a match.",
+                    code=21,
+                )
+
             base = cls.add_data(data, base, order)
 
         Logger.info("Saving template data.")
 
-        try:
-            with open(f"{template_file}.json", "w") as file:
-                dump(
-                    base,
-                    file,
-                    indent=4,
-                    ensure_ascii=False,
-                    cls=DecimalEncoder,
+        # * The template is replaced whole under its lock, the journal of the previous
+        # * template does not apply to the new one
+        with template_lock(template_file):
+            try:
+                atomic_write(
+                    f"{template_file}.json",
+                    dumps(
+                        base,
+                        indent=4,
+                        ensure_ascii=False,
+                        cls=DecimalEncoder,
+                    ),
                 )
-        except Exception as error:
-            Logger.debug(f"Exception: {error}")
-            # ! ERROR CODE 9
-            Logger.err_exit(f"Failed writing to JSON {template_file}.json.", code=9)
+            except Exception as error:
+                Logger.debug(f"Exception: {error}")
+                # ! ERROR CODE 9
+                Logger.err_exit(f"Failed writing to JSON {template_file}.json.", code=9)
+
+            if path.isfile(template_journal_file(template_file)):
+                remove(template_journal_file(template_file))
 
     @classmethod
     def __get_new_data(cls, json_file: str) -> NewData:
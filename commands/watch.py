@@ -0,0 +1,199 @@
+import os
+import signal
+from queue import Empty, Queue
+from statistics import mean, quantiles
+from threading import Event, Thread
+from time import monotonic
+
+from .compare import Compare
+from .process import Process
+
+from folder_events import FolderEvents
+from image_io import ImageIO
+from logger import Logger
+from timings import Timings
+
+
+class Watch:
+    """
+    The class responsible for processing, and comparing if a template is given, every
+    image written to a folder as soon as it lands.
+    """
+
+    IMAGE_EXTENSIONS = ImageIO.EXTENSIONS
+    # * Format of the error images, by its extension
+    ERROR_IMAGE_EXTENSION = os.getenv("ERROR_IMAGE_EXTENSION", ".png")
+
+    @classmethod
+    def run(
+        cls,
+        folder: str,
+        json_dir: str,
+        template_file: str | None,
+        save_dir: str | None,
+        queue_size: int,
+    ):
+        """
+        Run the watch command until interrupted.
+
+        Parameters
+        ----------
+        folder : str
+            The folder the images are written to.
+        json_dir : str
+            Directory the JSON files are written to, each named after its image.
+        template_file : str | None
+            Path and only name of the template, without the .json extension, the
+            images are only processed if not given.
+        save_dir : str | None
+            Directory the error images are saved to, named <image>_errors.png.
+        queue_size : int
+            Maximum number of images waiting to be processed, the folder is not read
+            while the queue is full.
+        """
+
+        Logger.debug("Running watch command.")
+
+        if not os.path.isdir(folder):
+            # ! ERROR CODE 5
+            Logger.err_exit(f"{folder} not found.", code=5)
+
+        for directory in [json_dir, save_dir]:
+            if directory is None:
+                continue
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except Exception as error:
+                Logger.debug(f"Exception: {error}")
+                # ! ERROR CODE 9
+                Logger.err_exit(f"Failed creating directory {directory}.", code=9)
+
+        # * Stop cleanly when the service manager terminates the watch
+        signal.signal(signal.SIGTERM, cls.__stop)
+
+        events = FolderEvents(folder, cls.IMAGE_EXTENSIONS)
+        queue: Queue[tuple[str, float]] = Queue(maxsize=max(queue_size, 1))
+        stop = Event()
+        Thread(target=cls.__enqueue, args=(events, queue, stop), daemon=True).start()
+
+        Logger.info(f"Watching {folder}.")
+        latencies: list[float] = []
+        failed = 0
+        try:
+            while True:
+                try:
+                    read_image, detected = queue.get(timeout=1)
+                except Empty:
+                    continue
+
+                if cls.__run_image(
+                    read_image, detected, json_dir, template_file, save_dir, latencies
+                ):
+                    continue
+                failed += 1
+        except KeyboardInterrupt:
+            Logger.info("Watch stopped.")
+        finally:
+            stop.set()
+            events.close()
+
+        cls.__summary(latencies, failed)
+
+    @classmethod
+    def __stop(cls, *_):
+        """Signal handler stopping the watch the same way as Ctrl+C."""
+
+        raise KeyboardInterrupt()
+
+    @classmethod
+    def __enqueue(
+        cls,
+        events: FolderEvents,
+        queue: "Queue[tuple[str, float]]",
+        stop: Event,
+    ):
+        """Put the new images in the queue, waiting while it is full."""
+
+        try:
+            for event in events:
+                if stop.is_set():
+                    return
+                queue.put(event)
+        except OSError as error:
+            if not stop.is_set():
+                Logger.critical(f"Stopped watching the folder: {error}")
+
+    @classmethod
+    def __run_image(
+        cls,
+        read_image: str,
+        detected: float,
+        json_dir: str,
+        template_file: str | None,
+        save_dir: str | None,
+        latencies: list[float],
+    ) -> bool:
+        """
+        Process and compare a single image, logging its latency.
+
+        Returns
+        -------
+        bool
+            If the image was processed without errors exits.
+        """
+
+        name = os.path.splitext(os.path.basename(read_image))[0]
+        json_file = os.path.join(json_dir, name)
+        start = monotonic()
+        try:
+            # * The process and compare of the image are timed as a single piece
+            with Timings.piece(name):
+                Process.run(read_image, json_file, template_file)
+                processed = monotonic()
+
+                result = "processed"
+                if template_file is not None:
+                    image_save_file = os.path.join(
+                        save_dir or json_dir,
+                        f"{name}_errors{cls.ERROR_IMAGE_EXTENSION}",
+                    )
+                    error = Compare.run(
+                        image_save_file, read_image, json_file, template_file
+                    )
+                    result = "correct" if error is None else "incorrect"
+        except SystemExit as error:
+            Logger.warning(f"{read_image} failed with code {error.code}.")
+            return False
+        except Exception as error:
+            Logger.critical(f"Unexpected error processing {read_image}: {error}")
+            return False
+
+        end = monotonic()
+        latencies.append(end - detected)
+        Logger.info(
+            f"{read_image} {result}: waited {(start - detected) * 1000:.1f}ms,"
+            + f" process {(processed - start) * 1000:.1f}ms,"
+            + f" compare {(end - processed) * 1000:.1f}ms,"
+            + f" total {(end - detected) * 1000:.1f}ms."
+        )
+        return True
+
+    @classmethod
+    def __summary(cls, latencies: list[float], failed: int):
+        """Log the latency statistics of the watched images."""
+
+        if len(latencies) == 0:
+            Logger.info(f"No images processed, {failed} failed.")
+            return
+
+        percentiles = (
+            quantiles(latencies, n=100, method="inclusive")
+            if len(latencies) > 1
+            else [latencies[0]] * 99
+        )
+        Logger.info(
+            f"{len(latencies)} images processed, {failed} failed. Latency mean"
+            + f" {mean(latencies) * 1000:.1f}ms, p50 {percentiles[49] * 1000:.1f}ms,"
+            + f" p95 {percentiles[94] * 1000:.1f}ms,"
+            + f" max {max(latencies) * 1000:.1f}ms."
+        )
@@ -0,0 +1,391 @@
+from hashlib import sha256
+from io import BytesIO
+from json import dumps, load, loads
+from os import path, stat
+from typing import Literal
+
+import numpy as np
+
+from logger import Logger
+from self_types import BaseData, NewData
+from template_journal import TemplateJournal
+from utils import atomic_write
+
+
+class CompiledTemplate:
+    """
+    The numbers of a template the compare checks a piece against, compiled into a
+    float array in a '<template>_compiled.npy' sidecar. The array is memory mapped
+    when loaded. '<template>_compiled.json' holds the box stats, the hash of the
+    template JSON and the size of the journal it was compiled from. The sidecar is
+    written when the template is compacted or compiled again, the entries appended
+    to the journal after are added to it when loaded.
+
+    Each row is an area, sorted by id, with the columns:
+
+    - 0: id.
+    - 1-4: area in pixels, mean, stdev, lower and upper bound.
+    - 5-8, 9-12, 13-16, 17-20: distance in pixels to the corners in CORNERS, mean,
+      stdev, lower and upper bound.
+
+    The bounds are the mean within 3 standard deviations.
+    """
+
+    CORNERS = ("top_left", "top_right", "bottom_right", "bottom_left")
+    COLUMNS = 21
+    # * Bumped when the layout changes, so old sidecars are rebuilt
+    VERSION = 2
+
+    # * Templates kept between pieces when running as a server, with the modification
+    # * time and size of the template and the size of the journal they were compiled
+    # * from
+    __cache: dict[str, tuple[tuple[int, int, int], "CompiledTemplate"]] = {}
+
+    def __init__(self, areas: np.ndarray, meta: dict):
+        self.areas = areas
+        self.meta = meta
+        self.ids = areas[:, 0]
+        self.area_mean = areas[:, 1]
+        self.area_stdev = areas[:, 2]
+        self.area_low = areas[:, 3]
+        self.area_high = areas[:, 4]
+        self.distance_mean = areas[:, 5:9]
+        self.distance_stdev = areas[:, 9:13]
+        self.distance_low = areas[:, 13:17]
+        self.distance_high = areas[:, 17:21]
+        self.box_low: float = meta["box"]["low"]
+        self.box_high: float = meta["box"]["high"]
+        # * The sha256 of the template JSON, that the journal entries are keyed by
+        self.digest: str = meta["hash"]
+
+    @classmethod
+    def load(cls, template_file: str) -> "CompiledTemplate":
+        """
+        Load the compiled template, compiling it again if the template or its journal
+        changed since.
+
+        Parameters
+        ----------
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+        """
+
+        json_file = f"{template_file}.json"
+        if not path.isfile(json_file):
+            # ! ERROR CODE 10
+            Logger.err_exit(f"JSON {json_file} not found.", code=10)
+
+        key = cls.__key(template_file)
+        cached = cls.__cache.get(template_file)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        # * The template did not change, only the entries appended since are added
+        if (
+            cached is not None
+            and cached[0][:2] == key[:2]
+            and cached[1].meta["journal"] <= key[2]
+        ):
+            compiled = cls.__catch_up(template_file, cached[1], key[2])
+            cls.__cache[template_file] = (key, compiled)
+            return compiled
+
+        with open(json_file, "rb") as file:
+            content = file.read()
+
+        compiled = cls.__read(template_file, sha256(content).hexdigest(), key[2])
+        if compiled is not None:
+            compiled = cls.__catch_up(template_file, compiled, key[2])
+        else:
+            Logger.debug(f"Compiling template {json_file}.")
+            if key[2] == 0:
+                # * The numbers are strings, so they are parsed without the Decimal hook
+                try:
+                    template = loads(content)
+                except Exception as error:
+                    Logger.debug(f"{error}")
+                    # ! ERROR CODE 11
+                    Logger.err_exit(f"Unable to read JSON {json_file}.", code=11)
+                compiled = cls.build(template_file, template, content)
+            else:
+                template, content, entries, journal = TemplateJournal.read(
+                    template_file
+                )
+                compiled = cls.build(template_file, template, content, journal, entries)
+
+        cls.__cache[template_file] = (key, compiled)
+        return compiled
+
+    @classmethod
+    def build(
+        cls,
+        template_file: str,
+        template: BaseData,
+        content: bytes,
+        journal: int = 0,
+        entries: int = 0,
+    ) -> "CompiledTemplate":
+        """
+        Compile the template and write the sidecar, for the template just read or
+        written.
+
+        Parameters
+        ----------
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+        template : BaseData
+            The template with its journal replayed, with Decimal or string numbers.
+        content : bytes
+            The content of the template JSON, that the sidecar is keyed by.
+        journal : int
+            The size of the journal replayed in bytes.
+        entries : int
+            The number of entries of the journal replayed.
+        """
+
+        areas = np.empty((len(template["areas"]), cls.COLUMNS), dtype=np.float64)
+        for row, area in enumerate(sorted(template["areas"], key=lambda x: x["id"])):
+            area_mean = float(area["mean"]["area_px"])
+            area_stdev = float(area["stdev"]["area_px"])
+            means = [float(area["mean"]["distance_px"][key]) for key in cls.CORNERS]
+            stdevs = [float(area["stdev"]["distance_px"][key]) for key in cls.CORNERS]
+            areas[row] = [
+                area["id"],
+                area_mean,
+                area_stdev,
+                area_mean - area_stdev * 3,
+                area_mean + area_stdev * 3,
+                *means,
+                *stdevs,
+                *[mean - stdev * 3 for mean, stdev in zip(means, stdevs)],
+                *[mean + stdev * 3 for mean, stdev in zip(means, stdevs)],
+            ]
+
+        box_mean = float(template["info"]["stats"]["mean"]["area_px"])
+        box_stdev = float(template["info"]["stats"]["stdev"]["area_px"])
+        meta = {
+            "version": cls.VERSION,
+            "hash": sha256(content).hexdigest(),
+            "journal": journal,
+            "entries": entries,
+            "rows": len(areas),
+            "total_areas": template["info"]["total_areas"],
+            "sample_size": template["info"]["sample_size"],
+            "mm_to_px": str(template["info"]["mm_to_px"]),
+            "mm_to_px_squared": str(template["info"]["mm_to_px_squared"]),
+            "box": {
+                "mean": box_mean,
+                "stdev": box_stdev,
+                "low": box_mean - box_stdev * 3,
+                "high": box_mean + box_stdev * 3,
+            },
+        }
+
+        cls.__write(template_file, areas, meta)
+        return cls(areas, meta)
+
+    @classmethod
+    def add(
+        cls,
+        template_file: str,
+        compiled: "CompiledTemplate",
+        journal: int,
+        data: NewData | None = None,
+        order: (
+            list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]] | None
+        ) = None,
+    ) -> "CompiledTemplate":
+        """
+        Update the compiled template with an entry just appended to the journal, the
+        same way Train.add_data updates the template, so it is not compiled again.
+        Only the template kept in memory is updated, the sidecar is written when the
+        journal is compacted, the other processes read the entries from the journal.
+
+        Parameters
+        ----------
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+        compiled : CompiledTemplate
+            The compiled template before the entry.
+        journal : int
+            The size of the journal with the entry in bytes.
+        data : NewData | None
+            The data of the correct piece added, None for failures, which do not
+            change the stats.
+        order : list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]]
+            The order of the corners of the data.
+        """
+
+        added = cls.__add(compiled, journal, data, order)
+        cls.__cache[template_file] = (cls.__key(template_file), added)
+
+        return added
+
+    @classmethod
+    def __add(
+        cls,
+        compiled: "CompiledTemplate",
+        journal: int,
+        data: NewData | None,
+        order: (
+            list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]] | None
+        ),
+    ) -> "CompiledTemplate":
+        """Add an entry of the journal to a copy of the compiled template."""
+
+        areas = np.array(compiled.areas)
+        meta = {**compiled.meta, "box": {**compiled.meta["box"]}}
+
+        if data is not None and order is not None:
+            sample_size = meta["sample_size"]
+
+            box = meta["box"]
+            box["mean"], box["stdev"] = cls.__add_sample(
+                box["mean"],
+                box["stdev"],
+                float(data["info"]["box"]["area_px"]),
+                sample_size,
+                sample_size,
+            )
+            box["low"] = box["mean"] - box["stdev"] * 3
+            box["high"] = box["mean"] + box["stdev"] * 3
+
+            rows = np.searchsorted(areas[:, 0], [area["id"] for area in data["areas"]])
+            area_px = np.array([float(area["area_px"]) for area in data["areas"]])
+            distances = np.array(
+                [
+                    [float(area["distance_px"][key]) for key in order]
+                    for area in data["areas"]
+                ]
+            ).reshape(-1, 4)
+
+            # * Train.add_data takes the variance of the distance to the bottom left
+            # * corner over the new sample size, which is kept so both agree
+            for mean, stdev, value, variance_size in (
+                (1, 2, area_px, sample_size),
+                (slice(5, 8), slice(9, 12), distances[:, :3], sample_size),
+                (8, 12, distances[:, 3], sample_size + 1),
+            ):
+                new_mean, new_stdev = cls.__add_sample(
+                    areas[rows, mean],
+                    areas[rows, stdev],
+                    value,
+                    sample_size,
+                    variance_size,
+                )
+                areas[rows, mean] = new_mean
+                areas[rows, stdev] = new_stdev
+            areas[:, 3] = areas[:, 1] - areas[:, 2] * 3
+            areas[:, 4] = areas[:, 1] + areas[:, 2] * 3
+            areas[:, 13:17] = areas[:, 5:9] - areas[:, 9:13] * 3
+            areas[:, 17:21] = areas[:, 5:9] + areas[:, 9:13] * 3
+
+            meta["sample_size"] = sample_size + 1
+
+        meta["journal"] = journal
+        meta["entries"] += 1
+
+        return cls(areas, meta)
+
+    @classmethod
+    def __catch_up(
+        cls, template_file: str, compiled: "CompiledTemplate", journal: int
+    ) -> "CompiledTemplate":
+        """
+        Add the entries appended to the journal after the ones the compiled template
+        has, skipping the cut and invalid ones as TemplateJournal.read does.
+        """
+
+        offset = compiled.meta["journal"]
+        if offset >= journal:
+            return compiled
+
+        with open(TemplateJournal.file(template_file), "rb") as file:
+            file.seek(offset)
+            lines = file.read(journal - offset).splitlines()
+
+        if offset == 0:
+            # * A journal of another template is not replayed, so it is not skipped
+            if len(lines) == 0 or lines[0] != TemplateJournal.header(compiled.digest):
+                return compiled
+            lines = lines[1:]
+
+        for line in lines:
+            try:
+                entry = loads(line)
+            except ValueError:
+                continue
+            if not TemplateJournal.valid(entry, len(compiled.ids)):
+                continue
+            compiled = cls.__add(
+                compiled, journal, entry.get("sample"), entry.get("order")
+            )
+
+        return cls(compiled.areas, {**compiled.meta, "journal": journal})
+
+    @classmethod
+    def __add_sample(cls, mean, stdev, value, old_sample_size: int, variance_size: int):
+        """Add a value to a mean and stdev of a sample, as Train.add_data does."""
+
+        new_mean = (mean * old_sample_size + value) / (old_sample_size + 1)
+        if variance_size == 0:
+            return new_mean, stdev * 0
+
+        variance = (
+            (variance_size - 1) * stdev**2 + (value - mean) * (value - new_mean)
+        ) / variance_size
+
+        return new_mean, np.sqrt(np.maximum(variance, 0))
+
+    @classmethod
+    def __key(cls, template_file: str) -> tuple[int, int, int]:
+        """Get the modification time and size of the template and of its journal."""
+
+        status = stat(f"{template_file}.json")
+        journal_file = TemplateJournal.file(template_file)
+        journal = stat(journal_file).st_size if path.isfile(journal_file) else 0
+
+        return status.st_mtime_ns, status.st_size, journal
+
+    @classmethod
+    def __write(cls, template_file: str, areas: np.ndarray, meta: dict):
+        """
+        Write the sidecar, it is replaced and not overwritten, since other pieces may
+        have it mapped.
+        """
+
+        # * The sidecar is only a cache, the compare goes on if it can not be written
+        try:
+            array = BytesIO()
+            np.save(array, areas)
+            atomic_write(f"{template_file}_compiled.npy", array.getvalue())
+            atomic_write(f"{template_file}_compiled.json", dumps(meta, indent=4))
+        except Exception as error:
+            Logger.warning(f"Unable to write the compiled template: {error}")
+
+    @classmethod
+    def __read(
+        cls, template_file: str, digest: str, journal: int
+    ) -> "CompiledTemplate | None":
+        """
+        Memory map the sidecar, None if missing, not of the template given or
+        compiled from more of the journal than there is.
+        """
+
+        try:
+            with open(f"{template_file}_compiled.json", "r") as file:
+                meta = load(file)
+            if (
+                meta["version"] != cls.VERSION
+                or meta["hash"] != digest
+                or meta["journal"] > journal
+            ):
+                return None
+            areas = np.load(f"{template_file}_compiled.npy", mmap_mode="r")
+            if areas.shape != (meta["rows"], cls.COLUMNS):
+                return None
+        except Exception as error:
+            Logger.debug(f"Compiled template not used: {error}")
+            return None
+
+        return cls(areas, meta)
@@ -2,10 +2,14 @@ from math import ceil, pi, sqrt
 from typing import cast
 
 import cv2 as cv
+import numpy as np
 from cv2.typing import MatLike
 
+from image_io import ImageIO
 from logger import Logger
 from self_types import Errors
+from station import Station
+from timings import Timings
 
 
 class Correct:
@@ -36,15 +40,54 @@ class Correct:
 
         Logger.debug("Running correct command.")
         Logger.debug("Reading image.")
-        image = cls.__io_image(read_image, None)
-        image = cast(MatLike, image)
+        with Timings.stage("decode"):
+            image = cls.__io_image(read_image, None)
+        if image is None:
+            # ! ERROR CODE 6
+            Logger.err_exit(f"OPENCV | Unable to read/write {read_image}.", code=6)
+
+        cls.run_frame(image_save_file, cast(MatLike, image), errors)
+
+    @classmethod
+    def run_frame(cls, image_save_file: str, frame: MatLike, errors: Errors):
+        """
+        Draw the errors on a frame in memory and save it to the disk, the frame itself
+        is left untouched.
+
+        Parameters
+        ----------
+        image_save_file : str
+            The path to save the image to.
+        frame : MatLike
+            The whole image, in grey or colour.
+        errors : Errors
+            The errors data.
+        """
+
+        # * The error positions are relative to the ROI, so it is drawn on directly
+        with Timings.stage("correct_render"):
+            image = Station.ROI.crop(frame)
+            if image.ndim == 2 or image.shape[2] == 1:
+                image = cv.cvtColor(image, cv.COLOR_GRAY2BGR)
+            else:
+                image = image.copy()
+            cls.__render(image, errors)
+
+        Logger.debug("Writing image.")
+        with Timings.stage("encode"):
+            cls.__io_image(image_save_file, image)
+        Logger.debug("Correct command finished.")
+
+    @classmethod
+    def __render(cls, image: MatLike, errors: Errors):
+        """Draw the errors on the image."""
 
         if errors["areas"] is not None:
             for error in errors["areas"]:
                 color: tuple[int, int, int] = (255, 0, 0)
                 position = (
-                    (error["correct_center_px"]["x"] + 2000),
-                    (error["correct_center_px"]["y"] + 1200),
+                    error["correct_center_px"]["x"],
+                    error["correct_center_px"]["y"],
                 )
                 if error["kind"] == "unexpected":
                     radius = 25
@@ -83,11 +126,6 @@ class Correct:
                     2,
                 )
 
-        image = image[1200 : 1200 + 4900, 2000 : 2000 + 5200]
-        Logger.debug("Writing image.")
-        cls.__io_image(image_save_file, image)
-        Logger.debug("Correct command finished.")
-
     @classmethod
     def __io_image(cls, image_name: str, image: MatLike | None) -> MatLike | None:
         """
@@ -102,15 +140,16 @@ class Correct:
             The image to write.
 
         """
-        if not image_name.endswith(".png"):
+        if not ImageIO.is_image(image_name):
             # ! ERROR CODE 4
-            Logger.err_exit(f"{image_name} is not PNG.", code=4)
+            Logger.err_exit(f"{image_name} is not a supported image.", code=4)
         try:
             if image is None:
-                return cv.imread(image_name, cv.IMREAD_COLOR)
-            else:
-                cv.imwrite(image_name, image)
-                return
+                # * The frames are mono, only the ROI is turned to colour to draw on
+                return ImageIO.read(image_name)
+            elif not ImageIO.write(image_name, image):
+                raise Exception("Image not written.")
+            return
         except Exception as err:
             Logger.debug(f"{err}")
             # ! ERROR CODE 6
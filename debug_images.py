@@ -0,0 +1,120 @@
+import os
+from typing import Literal
+
+from cv2.typing import MatLike
+
+from image_writer import ImageWriter
+from logger import Logger
+
+
+class DebugImages:
+    """
+    Class to save the intermediate images of the processing for debugging, written in
+    the background so they never add to the inspection time.
+    """
+
+    _LEVEL: Literal["off", "sampled", "always"] = "off"
+    _EVERY = 10
+    _OUTPUT_DIR = "./images/output"
+    _MAX_QUEUE = 16
+
+    __writer: ImageWriter | None = None
+    __count = 0
+    __active = False
+    __per_piece = False
+    __piece_dir = "./images/output"
+
+    @classmethod
+    def configure(
+        cls,
+        level: Literal["off", "sampled", "always"],
+        every: int = 10,
+        output_dir: str = "./images/output",
+        per_piece: bool = False,
+    ):
+        """
+        Configure when the debug images are saved.
+
+        Parameters
+        ----------
+        level : Literal["off", "sampled", "always"]
+            Never save, save one every `every` pieces or save every piece.
+        every : int
+            The sampling interval for the sampled level.
+        output_dir : str
+            The directory the images are saved to.
+        per_piece : bool
+            If the images of each piece are saved in their own sub directory, named
+            after the piece.
+        """
+
+        cls._LEVEL = level
+        cls._EVERY = max(every, 1)
+        cls._OUTPUT_DIR = output_dir
+        cls.__count = 0
+        cls.__active = False
+        cls.__per_piece = per_piece
+        cls.__piece_dir = output_dir
+
+        if level != "off":
+            os.makedirs(output_dir, exist_ok=True)
+            if cls.__writer is None:
+                cls.__writer = ImageWriter(max_queue=cls._MAX_QUEUE, block=False)
+
+        Logger.debug(f"Debug images: {level}, every {cls._EVERY}, to {output_dir}.")
+
+    @classmethod
+    def start_piece(cls, piece: str | None = None) -> bool:
+        """
+        Mark the start of a new piece and decide if its images are saved.
+
+        Parameters
+        ----------
+        piece : str | None
+            The name of the piece, used as sub directory when saving per piece.
+
+        Returns
+        -------
+        bool
+            If the images of this piece are saved.
+        """
+
+        if cls._LEVEL == "off":
+            cls.__active = False
+        elif cls._LEVEL == "always":
+            cls.__active = True
+        else:
+            cls.__active = cls.__count % cls._EVERY == 0
+
+        cls.__count += 1
+
+        cls.__piece_dir = cls._OUTPUT_DIR
+        if cls.__active and cls.__per_piece and piece is not None:
+            cls.__piece_dir = os.path.join(cls._OUTPUT_DIR, piece)
+            os.makedirs(cls.__piece_dir, exist_ok=True)
+
+        return cls.__active
+
+    @classmethod
+    def enabled(cls) -> bool:
+        """If the images of the current piece are saved."""
+
+        return cls.__active
+
+    @classmethod
+    def write(cls, image_name: str, image: MatLike):
+        """Queue a copy of the image to be saved if the current piece is sampled."""
+
+        if not cls.__active or cls.__writer is None:
+            return
+
+        cls.__writer.submit(os.path.join(cls.__piece_dir, image_name), image.copy())
+
+    @classmethod
+    def flush(cls):
+        """Wait until the queued images are saved."""
+
+        if cls.__writer is not None:
+            cls.__writer.flush()
+            if cls.__writer.dropped > 0:
+                Logger.warning(f"{cls.__writer.dropped} debug images were dropped.")
@@ -0,0 +1,111 @@
+import ctypes
+import os
+import struct
+from ctypes.util import find_library
+from select import select
+from time import monotonic, sleep
+from typing import Iterator
+
+from logger import Logger
+
+
+class FolderEvents:
+    """
+    Notifies the files written to a folder, using inotify where available and polling
+    the folder otherwise.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    POLL_INTERVAL = 0.2
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, folder: str, extensions: tuple[str, ...]):
+        """
+        Parameters
+        ----------
+        folder : str
+            The folder to watch.
+        extensions : tuple[str, ...]
+            The lower case extensions of the files notified.
+        """
+
+        self.folder = folder
+        self.extensions = extensions
+        self.__fd = -1
+
+        try:
+            libc = ctypes.CDLL(find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            if (
+                libc.inotify_add_watch(
+                    fd, folder.encode(), self.IN_CLOSE_WRITE | self.IN_MOVED_TO
+                )
+                < 0
+            ):
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+            self.__fd = fd
+            Logger.debug(f"Watching {folder} with inotify.")
+        except (OSError, AttributeError) as error:
+            Logger.warning(f"inotify unavailable ({error}), polling {folder} instead.")
+
+    def __iter__(self) -> Iterator[tuple[str, float]]:
+        """Yield the path and the monotonic time of detection of each new file."""
+
+        if self.__fd >= 0:
+            return self.__notify()
+        return self.__poll()
+
+    def close(self):
+        """Stop watching the folder."""
+
+        if self.__fd >= 0:
+            os.close(self.__fd)
+            self.__fd = -1
+
+    def __wanted(self, name: str) -> bool:
+        """If the file is notified, hidden files like those still being written are not."""
+
+        return not name.startswith(".") and name.lower().endswith(self.extensions)
+
+    def __notify(self) -> Iterator[tuple[str, float]]:
+        """Yield the files notified by inotify."""
+
+        while self.__fd >= 0:
+            ready, _, _ = select([self.__fd], [], [], 1)
+            if len(ready) == 0:
+                continue
+
+            buffer = os.read(self.__fd, 64 * 1024)
+            detected = monotonic()
+            offset = 0
+            while offset < len(buffer):
+                _, _, _, length = self._EVENT.unpack_from(buffer, offset)
+                offset += self._EVENT.size
+                name = buffer[offset : offset + length].rstrip(b"\0").decode()
+                offset += length
+
+                if self.__wanted(name):
+                    yield os.path.join(self.folder, name), detected
+
+    def __poll(self) -> Iterator[tuple[str, float]]:
+        """Yield the new files of the folder once their size stops changing."""
+
+        seen = set(os.listdir(self.folder))
+        sizes: dict[str, int] = {}
+        while True:
+            sleep(self.POLL_INTERVAL)
+            for entry in os.scandir(self.folder):
+                if entry.name in seen or not self.__wanted(entry.name):
+                    continue
+
+                size = entry.stat().st_size
+                if sizes.get(entry.name) == size:
+                    seen.add(entry.name)
+                    sizes.pop(entry.name)
+                    yield entry.path, monotonic()
+                else:
+                    sizes[entry.name] = size
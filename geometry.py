@@ -0,0 +1,36 @@
+from decimal import Decimal
+
+import numpy as np
+
+
+def to_decimal(values: np.ndarray) -> list[Decimal]:
+    """
+    Convert an array of numbers to Decimal, using the shortest representation of each
+    float so the JSON does not get the binary rounding noise.
+    """
+
+    return [Decimal(str(value)) for value in values.tolist()]
+
+
+def corner_distances(points: np.ndarray, box: np.ndarray) -> np.ndarray:
+    """
+    Calculate the distance between every point and every corner of a box.
+
+    Parameters
+    ----------
+    points : np.ndarray
+        The (n, 2) array of x and y coordinates of the points.
+    box : np.ndarray
+        The (4, 2) array of the box corners, clockwise from the top left.
+
+    Returns
+    -------
+    np.ndarray
+        The (n, 4) array of distances to the top left, top right, bottom right and
+        bottom left corners.
+    """
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+    box = np.asarray(box, dtype=np.float64).reshape(1, 4, 2)
+
+    return np.hypot(points[..., 0] - box[..., 0], points[..., 1] - box[..., 1])
@@ -0,0 +1,130 @@
+from io import BytesIO
+from os import getenv, path
+
+import cv2 as cv
+import numpy as np
+from cv2.typing import MatLike
+
+
+class ImageIO:
+    """
+    Class to read and write images in the format given by the file extension, so each
+    artefact can use the format that suits it:
+
+    - .npy: raw array, memory mapped when read so only the pixels used are loaded.
+    - .pgm: raw mono image, no compression.
+    - .tif / .tiff: TIFF, compressed with TIFF_COMPRESSION, 1 for none.
+    - .png: PNG, compressed with PNG_COMPRESSION from 0 to 9.
+    - .jpg / .jpeg: lossy JPEG with JPEG_QUALITY, only for annotated output.
+    """
+
+    EXTENSIONS = (".png", ".npy", ".pgm", ".tif", ".tiff", ".jpg", ".jpeg")
+
+    PNG_COMPRESSION = int(getenv("PNG_COMPRESSION", "1"))
+    TIFF_COMPRESSION = int(getenv("TIFF_COMPRESSION", "1"))
+    JPEG_QUALITY = int(getenv("JPEG_QUALITY", "90"))
+
+    @classmethod
+    def is_image(cls, image_file: str) -> bool:
+        """If the file has the extension of a supported format."""
+
+        return image_file.lower().endswith(cls.EXTENSIONS)
+
+    @classmethod
+    def read(cls, image_file: str, colour: bool = False) -> MatLike | None:
+        """
+        Read an image, a .npy is memory mapped instead, so slicing it only reads the
+        slice from the disk.
+
+        Parameters
+        ----------
+        image_file : str
+            The path to the image.
+        colour : bool
+            If the image is read in colour, otherwise in grey. A .npy is read as it was
+            written.
+
+        Returns
+        -------
+        MatLike | None
+            The image, None if it could not be read.
+        """
+
+        if cls.__extension(image_file) == ".npy":
+            try:
+                return np.load(image_file, mmap_mode="r")
+            except Exception:
+                return None
+
+        return cv.imread(image_file, cv.IMREAD_COLOR if colour else cv.IMREAD_GRAYSCALE)
+
+    @classmethod
+    def write(cls, image_file: str, image: MatLike) -> bool:
+        """
+        Write an image in the format of its extension.
+
+        Returns
+        -------
+        bool
+            If the image was written.
+        """
+
+        extension = cls.__extension(image_file)
+        if extension == ".npy":
+            np.save(image_file, np.ascontiguousarray(image))
+            return True
+
+        return cv.imwrite(image_file, image, cls.__params(extension))
+
+    @classmethod
+    def encode(cls, image_file: str, image: MatLike) -> bytes | None:
+        """
+        Encode an image in the format of the extension of the file, without writing
+        it, so it can be written under another name.
+
+        Returns
+        -------
+        bytes | None
+            The encoded image, None if it could not be encoded.
+        """
+
+        extension = cls.__extension(image_file)
+        if extension == ".npy":
+            buffer = BytesIO()
+            np.save(buffer, np.ascontiguousarray(image))
+            return buffer.getvalue()
+
+        encoded, data = cv.imencode(extension, image, cls.__params(extension))
+        return data.tobytes() if encoded else None
+
+    @classmethod
+    def temporary(cls, image_file: str) -> str:
+        """
+        Get the name an image is written under before being renamed to the file, hidden
+        and without an image extension so it is not taken for an image.
+        """
+
+        folder, name = path.split(image_file)
+        return path.join(folder, f".{name}.tmp")
+
+    @classmethod
+    def is_temporary(cls, image_file: str) -> bool:
+        """If the file is hidden, like an image still being written."""
+
+        return path.basename(image_file).startswith(".")
+
+    @classmethod
+    def __params(cls, extension: str) -> list[int]:
+        match extension:
+            case ".png":
+                return [cv.IMWRITE_PNG_COMPRESSION, cls.PNG_COMPRESSION]
+            case ".tif" | ".tiff":
+                return [cv.IMWRITE_TIFF_COMPRESSION, cls.TIFF_COMPRESSION]
+            case ".jpg" | ".jpeg":
+                return [cv.IMWRITE_JPEG_QUALITY, cls.JPEG_QUALITY]
+            case _:
+                return []
+
+    @classmethod
+    def __extension(cls, image_file: str) -> str:
+        return path.splitext(image_file)[1].lower()
@@ -0,0 +1,100 @@
+from os import path, remove, replace
+from queue import Full, Queue
+from threading import Thread
+from time import perf_counter
+
+from cv2.typing import MatLike
+
+from image_io import ImageIO
+from logger import Logger
+
+
+class ImageWriter:
+    """
+    Writes images to disk from background threads, so encoding them does not block the
+    caller.
+    """
+
+    def __init__(self, workers: int = 1, max_queue: int = 8, block: bool = True):
+        """
+        Parameters
+        ----------
+        workers : int
+            Number of threads writing images.
+        max_queue : int
+            Maximum number of images waiting to be written.
+        block : bool
+            If the caller waits for space when the queue is full, otherwise the image
+            is dropped.
+        """
+
+        self.__queue: Queue[tuple[str, MatLike]] = Queue(maxsize=max_queue)
+        self.__block = block
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        # * Most images waiting at once, and the time spent writing them
+        self.max_depth = 0
+        self.write_ms = 0.0
+        self.max_write_ms = 0.0
+
+        for i in range(workers):
+            Thread(target=self.__work, name=f"ImageWriter-{i}", daemon=True).start()
+
+    def submit(self, image_file: str, image: MatLike) -> bool:
+        """
+        Queue an image to be written, the image must not be changed after submitted.
+
+        Returns
+        -------
+        bool
+            If the image was queued.
+        """
+
+        try:
+            self.__queue.put((image_file, image), block=self.__block)
+        except Full:
+            self.dropped += 1
+            Logger.debug(f"Writer queue full, dropping {image_file}.")
+            return False
+
+        self.max_depth = max(self.max_depth, self.depth())
+        return True
+
+    def depth(self) -> int:
+        """Number of images waiting to be written."""
+
+        return self.__queue.qsize()
+
+    def flush(self):
+        """Wait until every queued image is written."""
+
+        self.__queue.join()
+
+    def __work(self):
+        """Write the queued images until the program exits."""
+
+        while True:
+            image_file, image = self.__queue.get()
+            start = perf_counter()
+            # * Written under a hidden name and renamed, so a reader of the file never
+            # * gets it half written and a watcher of the folder never sees it
+            temporary = ImageIO.temporary(image_file)
+            try:
+                data = ImageIO.encode(image_file, image)
+                if data is None:
+                    raise Exception("Image not encoded.")
+                with open(temporary, "wb") as file:
+                    file.write(data)
+                replace(temporary, image_file)
+                self.written += 1
+                elapsed = (perf_counter() - start) * 1000
+                self.write_ms += elapsed
+                self.max_write_ms = max(self.max_write_ms, elapsed)
+            except Exception as error:
+                self.failed += 1
+                Logger.warning(f"OPENCV | Unable to write {image_file}: {error}")
+                if path.exists(temporary):
+                    remove(temporary)
+            finally:
+                self.__queue.task_done()
@@ -8,14 +8,15 @@ class Logger:
 
     _LOGGER = logging.getLogger("PYTHON")
 
-    def __init__(self, log: str):
+    def __init__(self, log: str, stdout: bool = True):
         formatter = logging.Formatter(
             "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
             datefmt="%d-%b-%y %H:%M:%S",
         )
         level = logging._nameToLevel[log]
 
-        stdout_handler = logging.StreamHandler(sys.stdout)
+        # * When stdout carries the program output, everything is logged to stderr
+        stdout_handler = logging.StreamHandler(sys.stdout if stdout else sys.stderr)
         stdout_handler.setLevel(
             level
             if level
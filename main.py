@@ -1,11 +1,22 @@
 import os
 
-from args_parser import ArgsParser
+from args_parser import Args, ArgsParser
+from camera import CameraSession
+from commands.batch import Batch
+from commands.benchmark import Benchmark
+from commands.burst import Burst
 from commands.capture import Capture
 from commands.compare import Compare
+from commands.generate import Generate
+from commands.inspect import Inspect
 from commands.process import Process
+from commands.serve import Serve
 from commands.train import Train
+from commands.watch import Watch
+from debug_images import DebugImages
 from logger import Logger
+from station import Station
+from timings import Timings
 
 
 class Python:
@@ -16,16 +27,45 @@ class Python:
         """Main entry point of the program."""
 
         args = ArgsParser().parse_args()
-        Logger(args.log)
+        Logger(args.log, stdout=not (args.mode == "serve" and args.socket is None))
         Logger.debug(f"Arguments passed: {str(args)}")
         Logger.info("Program started.")
+        DebugImages.configure(args.debug_images, args.debug_every, args.debug_dir)
+        if args.mode != "calibrate":
+            Station.configure(args.station_file, args.roi)
+        Timings.configure(args.timings_file)
+
+        if args.mode == "serve":
+            Serve.run(args, cls.run)
+        else:
+            cls.run(args)
+
+        Capture.flush()
+        CameraSession.close_shared()
+        DebugImages.flush()
+        Timings.flush()
+        Logger.info("Program finished successfully.")
+        return
+
+    @classmethod
+    def run(cls, args: Args):
+        """
+        Run the command of the given arguments.
+
+        Returns
+        -------
+        NewData | Errors | None
+            The process data of the process command or the errors found by the compare
+            and inspect commands, None for the other commands or if no errors were
+            found.
+        """
 
         match args.mode:
             case "capture":
                 if args.image_save_file is None:
                     # ! ERROR CODE 1
                     Logger.err_exit("Missing Save Path.", code=1)
-                Capture.run(args.image_save_file)
+                Capture.run(args.image_save_file, args.wait)
 
             case "process":
                 json_file = args.json_file
@@ -39,7 +79,23 @@ class Python:
                 if json_file.endswith(".json"):
                     Logger.warning("JSON file should not have extension, removing it.")
                     json_file = json_file[:-5]
-                Process.run(args.read_image, json_file)
+                template_file = args.template_file
+                if template_file is not None and template_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    template_file = template_file[:-5]
+                if Batch.is_batch(args.read_image):
+                    Batch.run(
+                        args.read_image,
+                        json_file,
+                        args.workers,
+                        args.log,
+                        args.debug_images,
+                        args.debug_every,
+                        args.debug_dir,
+                        template_file,
+                    )
+                else:
+                    return Process.run(args.read_image, json_file, template_file)
 
             case "compare":
                 json_file = args.json_file
@@ -62,7 +118,7 @@ class Python:
                 if template_file.endswith(".json"):
                     Logger.warning("JSON file should not have extension, removing it.")
                     template_file = template_file[:-5]
-                Compare.run(
+                return Compare.run(
                     args.image_save_file, args.read_image, json_file, template_file
                 )
 
@@ -83,8 +139,106 @@ class Python:
                     template_file = template_file[:-5]
                 Train.run(json_file, template_file)
 
-        Logger.info("Program finished successfully.")
-        return
+            case "benchmark":
+                template_file = args.template_file
+                if template_file is not None and template_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    template_file = template_file[:-5]
+                if args.camera:
+                    Benchmark.camera(args.frames or 100, template_file)
+                elif args.read_image is None:
+                    Benchmark.pipeline(args.holes or Benchmark.HOLE_COUNTS, args.repeat)
+                else:
+                    Benchmark.run(args.read_image, args.repeat)
+
+            case "generate":
+                if args.image_save_file is None:
+                    # ! ERROR CODE 1
+                    Logger.err_exit("Missing Save Path.", code=1)
+                Generate.run(
+                    args.image_save_file,
+                    args.pieces,
+                    args.size,
+                    (args.holes or [48])[0],
+                    args.rotation,
+                    args.noise,
+                    args.missing,
+                    args.extra,
+                    args.seed,
+                )
+
+            case "watch":
+                json_file = args.json_file
+                template_file = args.template_file
+                if args.read_image is None:
+                    # ! ERROR CODE 2
+                    Logger.err_exit("Missing image path.", code=2)
+                if json_file is None:
+                    # ! ERROR CODE 3
+                    Logger.err_exit("Missing JSON path.", code=3)
+                if template_file is not None and template_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    template_file = template_file[:-5]
+                Watch.run(
+                    args.read_image,
+                    json_file,
+                    template_file,
+                    args.image_save_file,
+                    args.queue_size,
+                )
+
+            case "inspect":
+                json_file = args.json_file
+                template_file = args.template_file
+                if json_file is not None and json_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    json_file = json_file[:-5]
+                if template_file is None:
+                    # ! ERROR CODE 3
+                    Logger.err_exit("Missing JSON path.", code=3)
+                if template_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    template_file = template_file[:-5]
+                return Inspect.run(
+                    template_file, json_file, args.image_save_file, args.read_image
+                )
+
+            case "burst":
+                json_file = args.json_file
+                template_file = args.template_file
+                if args.image_save_file is None and json_file is None:
+                    # ! ERROR CODE 1
+                    Logger.err_exit("Missing Save Path.", code=1)
+                if json_file is not None and json_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    json_file = json_file[:-5]
+                if template_file is not None and template_file.endswith(".json"):
+                    Logger.warning("JSON file should not have extension, removing it.")
+                    template_file = template_file[:-5]
+                Burst.run(
+                    args.frames or Train.PIECES,
+                    args.image_save_file,
+                    json_file,
+                    template_file,
+                    args.workers,
+                    args.log,
+                    args.debug_images,
+                    args.debug_every,
+                    args.debug_dir,
+                )
+
+            case "calibrate":
+                if args.read_image is None:
+                    # ! ERROR CODE 2
+                    Logger.err_exit("Missing image path.", code=2)
+                if args.station_file is None:
+                    # ! ERROR CODE 3
+                    Logger.err_exit("Missing JSON path.", code=3)
+                Station.calibrate(args.read_image, args.station_file)
+
+            case "serve":
+                # ! ERROR CODE 16
+                Logger.err_exit("Serve can not be run from a request.", code=16)
 
 
 if __name__ == "__main__":
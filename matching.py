@@ -0,0 +1,234 @@
+from os import getenv
+from typing import Literal
+
+import numpy as np
+
+from self_types import Area, BaseArea
+from utils import fix_ids, switch
+
+
+class Matching:
+    """
+    Matches the areas of a piece to the areas of the template, giving each one the id
+    of its template area and finding the rotation of the piece.
+
+    The areas are placed by their distances to the top left and bottom left corners
+    of the box, indexed on a grid with cells as big as the match radius. Each rotation
+    is scored by how close every area is to its nearest template area, so a few
+    spurious areas do not decide it. The pairs within the radius are then assigned
+    from the closest, each area and template area taken once.
+    """
+
+    __CORNERS = ("top_left", "top_right", "bottom_right", "bottom_left")
+
+    # "assignment" for the grid matching, "greedy" for the previous utils.fix_ids
+    ENGINE = getenv("MATCHING", "assignment")
+    # Farthest an area can be from its template area, as a fraction of the spacing
+    # between the template areas
+    RADIUS = float(getenv("MATCHING_RADIUS", "0.5"))
+
+    @classmethod
+    def fix_ids(
+        cls,
+        areas: list[BaseArea],
+        new_areas: list[Area],
+    ) -> tuple[
+        list[Area],
+        list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]],
+    ]:
+        """
+        Fix the ids of the new data areas to match the template data areas, the areas
+        farther than the radius from every template area get the id -1.
+
+        Parameters
+        ----------
+        areas : list[BaseArea]
+            The template areas.
+        new_areas : list[Area]
+            The new data areas.
+
+        Returns
+        -------
+        tuple[list[Area], list[Literal["top_left", "top_right", "bottom_right",
+        "bottom_left"]]]
+            The new data areas with the fixed ids and the new order.
+        """
+
+        if cls.ENGINE == "greedy":
+            return fix_ids(areas, new_areas)
+
+        areas = sorted(areas, key=lambda x: x["id"])
+        means = np.array(
+            [
+                [area["mean"]["distance_px"][key] for key in cls.__CORNERS]
+                for area in areas
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+
+        return cls.match(
+            means, np.array([area["id"] for area in areas], dtype=np.int64), new_areas
+        )
+
+    @classmethod
+    def match(cls, means: np.ndarray, ids: np.ndarray, new_areas: list[Area]) -> tuple[
+        list[Area],
+        list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]],
+    ]:
+        """
+        Fix the ids of the new data areas to match the template areas given by their
+        mean distances, without the greedy engine.
+
+        Parameters
+        ----------
+        means : np.ndarray
+            The (n, 4) array of the mean distances in pixels of the template areas to
+            the corners.
+        ids : np.ndarray
+            The ids of the template areas.
+        new_areas : list[Area]
+            The new data areas.
+
+        Returns
+        -------
+        tuple[list[Area], list[Literal["top_left", "top_right", "bottom_right",
+        "bottom_left"]]]
+            The new data areas with the fixed ids and the new order.
+        """
+
+        order: list[Literal["top_left", "top_right", "bottom_right", "bottom_left"]] = [
+            "top_left",
+            "top_right",
+            "bottom_right",
+            "bottom_left",
+        ]
+
+        if len(means) == 0 or len(new_areas) == 0:
+            return new_areas, order
+
+        distances = np.array(
+            [[area["distance_px"][key] for key in order] for area in new_areas],
+            dtype=np.float64,
+        )
+
+        radius = cls.__radius(means)
+        grid = cls.__grid(means, radius)
+
+        # * Rotating the piece once moves each corner to the previous one
+        rotations: list[tuple[float, np.ndarray, np.ndarray, np.ndarray]] = []
+        for rotation in range(4):
+            rotated = np.roll(distances, -rotation, axis=1)
+            new, template = cls.__candidates(rotated, means, grid, radius)
+            costs = np.abs(rotated[new] - means[template]).sum(axis=1)
+
+            # Areas with no template area in the radius count as the farthest match
+            nearest = np.full(len(new_areas), radius * 4)
+            np.minimum.at(nearest, new, costs)
+            rotations.append((float(nearest.sum()), new, template, costs))
+
+        rotation = min(range(4), key=lambda i: rotations[i][0])
+        _, new, template, costs = rotations[rotation]
+        for _ in range(rotation):
+            order = switch(order)
+
+        for new_area in new_areas:
+            new_area["id"] = -1
+        taken = np.zeros(len(means), dtype=bool)
+        for i in np.lexsort((new, costs)):
+            new_area = new_areas[new[i]]
+            if new_area["id"] < 0 and not taken[template[i]]:
+                new_area["id"] = int(ids[template[i]])
+                taken[template[i]] = True
+
+        return new_areas, order
+
+    @classmethod
+    def __radius(cls, means: np.ndarray) -> float:
+        """
+        Get the match radius from the mean spacing between the template areas, on the
+        distances to the top left and bottom left corners.
+        """
+
+        extent = means[:, [0, 3]].max(axis=0) - means[:, [0, 3]].min(axis=0)
+        spacing = float(np.sqrt(extent[0] * extent[1] / len(means)))
+        if spacing <= 0:
+            # * Areas in a line are spread along it
+            spacing = float(extent.max()) / len(means)
+        if spacing <= 0:
+            # * A single area falls in a single cell
+            return float(means.max()) + 1
+        return spacing * cls.RADIUS
+
+    @classmethod
+    def __grid(cls, means: np.ndarray, radius: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Index the template areas on a grid of cells as big as the radius.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The cells of the template areas sorted, and the template areas in the
+            order of the sorted cells.
+        """
+
+        cells = np.floor(means[:, [0, 3]] / radius).astype(np.int64)
+        keys = cls.__key(cells[:, 0], cells[:, 1])
+        indices = np.argsort(keys, kind="stable")
+
+        return keys[indices], indices
+
+    @classmethod
+    def __candidates(
+        cls,
+        distances: np.ndarray,
+        means: np.ndarray,
+        grid: tuple[np.ndarray, np.ndarray],
+        radius: float,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Get the pairs of an area and a template area within the radius on the
+        distances to the top left and bottom left corners, searching the cell of each
+        area and the 8 around it.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            The index of the area and of the template area of each pair.
+        """
+
+        keys, indices = grid
+        cells = np.floor(distances[:, [0, 3]] / radius).astype(np.int64)
+
+        pairs_new: list[np.ndarray] = []
+        pairs_template: list[np.ndarray] = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                query = cls.__key(cells[:, 0] + dx, cells[:, 1] + dy)
+                start = np.searchsorted(keys, query, side="left")
+                counts = np.searchsorted(keys, query, side="right") - start
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                new = np.repeat(np.arange(len(distances)), counts)
+                offsets = np.arange(total) - np.repeat(
+                    np.cumsum(counts) - counts, counts
+                )
+                pairs_new.append(new)
+                pairs_template.append(indices[np.repeat(start, counts) + offsets])
+
+        if len(pairs_new) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        new = np.concatenate(pairs_new)
+        template = np.concatenate(pairs_template)
+        near = (
+            np.abs(distances[new][:, [0, 3]] - means[template][:, [0, 3]]) <= radius
+        ).all(axis=1)
+
+        return new[near], template[near]
+
+    @classmethod
+    def __key(cls, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Get a single number for each cell, the cells are far below 2**31."""
+
+        return (x << 32) + y
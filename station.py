@@ -0,0 +1,131 @@
+from json import dump, load
+from os import getenv
+from typing import NamedTuple
+
+import cv2 as cv
+import numpy as np
+from cv2.typing import MatLike
+
+from logger import Logger
+
+
+class Roi(NamedTuple):
+    """Region of the sensor image the piece is in."""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @classmethod
+    def parse(cls, roi: str) -> "Roi":
+        """Get the ROI from a 'x,y,width,height' string."""
+
+        try:
+            x, y, width, height = [int(value) for value in roi.split(",")]
+        except ValueError:
+            # ! ERROR CODE 19
+            Logger.err_exit(f"Invalid ROI {roi}, expected x,y,width,height.", code=19)
+
+        if x < 0 or y < 0 or width <= 0 or height <= 0:
+            # ! ERROR CODE 19
+            Logger.err_exit(f"Invalid ROI {roi}, expected x,y,width,height.", code=19)
+
+        return cls(x, y, width, height)
+
+    def crop(self, image: MatLike) -> MatLike:
+        """Get the ROI of the image, without copying it."""
+
+        if (
+            self.x + self.width > image.shape[1]
+            or self.y + self.height > image.shape[0]
+        ):
+            # ! ERROR CODE 19
+            Logger.err_exit(
+                f"ROI {self} is outside of the image of size {image.shape[:2]}.",
+                code=19,
+            )
+
+        return image[self.y : self.y + self.height, self.x : self.x + self.width]
+
+
+class Station:
+    """
+    The settings of the inspection station the program runs on, so the same code runs
+    different fixtures.
+    """
+
+    ROI = Roi.parse(getenv("ROI", "2000,1200,5200,4900"))
+    # Margin in pixels around the piece of the calibration image when detecting the ROI
+    ROI_MARGIN = int(getenv("ROI_MARGIN", "200"))
+
+    @classmethod
+    def configure(cls, station_file: str | None, roi: str | None):
+        """
+        Load the station settings, the ROI given overrides the one of the station file.
+
+        Parameters
+        ----------
+        station_file : str | None
+            Path to the station JSON written by the calibrate command.
+        roi : str | None
+            The ROI as 'x,y,width,height'.
+        """
+
+        if station_file is not None:
+            try:
+                with open(station_file, "r") as file:
+                    cls.ROI = Roi(**load(file)["roi"])
+            except Exception as error:
+                Logger.debug(f"{error}")
+                # ! ERROR CODE 11
+                Logger.err_exit(f"Unable to read JSON {station_file}.", code=11)
+
+        if roi is not None:
+            cls.ROI = Roi.parse(roi)
+
+        Logger.debug(f"ROI: {cls.ROI}.")
+
+    @classmethod
+    def calibrate(cls, read_image: str, station_file: str):
+        """
+        Run the calibrate command, detecting the ROI as the bounding rectangle of the
+        piece in a calibration image grown by ROI_MARGIN, and saving it to the station
+        JSON.
+        """
+
+        Logger.debug("Running calibrate command.")
+
+        image = cv.imread(read_image, cv.IMREAD_GRAYSCALE)
+        if image is None:
+            # ! ERROR CODE 6
+            Logger.err_exit(f"OPENCV | Unable to read/write {read_image}.", code=6)
+
+        _, image = cv.threshold(image, 0, 255, cv.THRESH_BINARY | cv.THRESH_OTSU)
+
+        # The piece is the biggest object of the colour not on most of the border
+        border = np.concatenate((image[0], image[-1], image[:, 0], image[:, -1]))
+        if np.count_nonzero(border) * 2 > len(border):
+            image = cv.bitwise_not(image)
+
+        contours, _ = cv.findContours(image, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
+        if len(contours) == 0:
+            # ! ERROR CODE 7
+            Logger.err_exit("No piece found.", code=7)
+
+        x, y, width, height = cv.boundingRect(max(contours, key=cv.contourArea))
+        x0 = max(x - cls.ROI_MARGIN, 0)
+        y0 = max(y - cls.ROI_MARGIN, 0)
+        x1 = min(x + width + cls.ROI_MARGIN, image.shape[1])
+        y1 = min(y + height + cls.ROI_MARGIN, image.shape[0])
+        cls.ROI = Roi(x0, y0, x1 - x0, y1 - y0)
+
+        Logger.info(f"Detected ROI: {cls.ROI}.")
+
+        try:
+            with open(station_file, "w") as file:
+                dump({"roi": cls.ROI._asdict()}, file, indent=4, ensure_ascii=False)
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed writing to JSON {station_file}", code=9)
@@ -0,0 +1,120 @@
+from math import ceil, cos, radians, sin, sqrt
+
+import cv2 as cv
+import numpy as np
+from cv2.typing import MatLike
+
+from station import Station
+
+
+class Synthetic:
+    """
+    Class to render synthetic plates, a dark rectangular piece with a grid of holes on
+    a light background inside the ROI of the station, so the pipeline can be run and
+    measured without the camera.
+    """
+
+    BACKGROUND = 230
+    PIECE = 30
+    # * Size of the piece relative to the ROI, leaving room for the rotation
+    PIECE_SCALE = (0.7, 0.6)
+    # * Offset of the grid from the center of the piece in cells, so the holes do not
+    # * look the same with the piece turned half way round, as on a real piece
+    GRID_OFFSET = 0.25
+
+    @classmethod
+    def plate(
+        cls,
+        size: tuple[int, int] = (7600, 6400),
+        holes: int = 48,
+        rotation: float = 7.0,
+        noise: float = 0.0,
+        missing: int = 0,
+        extra: int = 0,
+        seed: int = 0,
+    ) -> MatLike:
+        """
+        Render a plate. The layout of the holes only depends on their count, the seed
+        jitters the piece position, rotation and the holes like a real line would.
+
+        Parameters
+        ----------
+        size : tuple[int, int]
+            Width and height of the image in pixels.
+        holes : int
+            Number of holes of the piece, laid on a grid with sizes varying by position.
+        rotation : float
+            Rotation of the piece in degrees.
+        noise : float
+            Standard deviation of the gaussian noise added to the grey levels.
+        missing : int
+            Number of holes of the grid left out.
+        extra : int
+            Number of small holes added between the grid holes.
+        seed : int
+            Seed of the jitter and of the missing and extra holes picked.
+
+        Returns
+        -------
+        MatLike
+            The grey image of the plate.
+        """
+
+        rng = np.random.default_rng(seed)
+        image = np.full((size[1], size[0]), cls.BACKGROUND, dtype=np.uint8)
+
+        roi = Station.ROI
+        width = roi.width * cls.PIECE_SCALE[0]
+        height = roi.height * cls.PIECE_SCALE[1]
+        center_x = roi.x + roi.width / 2 + rng.normal(0, 5)
+        center_y = roi.y + roi.height / 2 + rng.normal(0, 5)
+        angle = rotation + rng.normal(0, 0.2)
+
+        box = cv.boxPoints(((center_x, center_y), (width, height), angle))
+        cv.fillPoly(image, [np.int32(np.round(box))], cls.PIECE)
+
+        # The grid keeps the aspect of the piece, with a cell of margin around it
+        columns = max(ceil(sqrt(holes * width / height)), 1)
+        rows = max(ceil(holes / columns), 1)
+        spacing = min(width / (columns + 1), height / (rows + 1))
+        max_radius = spacing * 0.3
+        min_radius = max_radius * 0.6
+
+        points: list[tuple[float, float, float]] = []
+        for i in range(holes):
+            column, row = i % columns, i // columns
+            x = (column - (columns - 1) / 2 + cls.GRID_OFFSET) * spacing
+            y = (row - (rows - 1) / 2 + cls.GRID_OFFSET) * spacing
+            step = (column * row) % 5 / 4
+            points.append((x, y, min_radius + step * (max_radius - min_radius)))
+
+        if 0 < missing:
+            keep = rng.permutation(len(points))[missing:]
+            points = [points[i] for i in sorted(keep)]
+
+        if 0 < extra:
+            cells = rng.permutation(max((columns - 1) * (rows - 1), 1))[:extra]
+            for cell in cells:
+                column, row = cell % max(columns - 1, 1), cell // max(columns - 1, 1)
+                x = (column + 0.5 - (columns - 1) / 2 + cls.GRID_OFFSET) * spacing
+                y = (row + 0.5 - (rows - 1) / 2 + cls.GRID_OFFSET) * spacing
+                points.append((x, y, min_radius * 0.5))
+
+        c, s = cos(radians(angle)), sin(radians(angle))
+        for x, y, radius in points:
+            hole_x = center_x + c * x - s * y + rng.normal(0, 0.5)
+            hole_y = center_y + s * x + c * y + rng.normal(0, 0.5)
+            cv.circle(
+                image,
+                (int(round(hole_x)), int(round(hole_y))),
+                max(int(round(radius + rng.normal(0, 0.5))), 1),
+                cls.BACKGROUND,
+                -1,
+            )
+
+        if 0 < noise:
+            noisy = rng.standard_normal(image.shape, dtype=np.float32) * noise
+            noisy += image
+            image = np.clip(noisy, 0, 255).astype(np.uint8)
+
+        return image
@@ -0,0 +1,252 @@
+import os
+from hashlib import sha256
+from json import dumps, loads
+from os import getenv
+from typing import ContextManager, Literal, cast
+
+from commands.train import Train
+from logger import Logger
+from self_types import BaseData, NewData
+from utils import (
+    DecimalEncoder,
+    atomic_write,
+    object_hook_decimal,
+    template_journal_file,
+    template_lock,
+)
+
+
+class TemplateJournal:
+    """
+    The updates of a template since it was last written, appended one line per piece
+    to '<template>_journal.jsonl' instead of rewriting the whole template:
+
+    - {"template": hash}: the first line, the sha256 of the template JSON the journal
+      applies to. A journal of another template, left by a crash after the template
+      was compacted, is ignored.
+    - {"sample": data, "order": order}: the data of a correct piece added to the
+      template.
+    - {"failed": [[id, kind], ...]}: the failures of an incorrect piece.
+
+    Every COMPACT_EVERY lines the journal is replayed into the template, which is
+    written again, and the journal removed.
+
+    Processes sharing a template take turns through the '<template>.lock' file, the
+    updates hold it alone and the reads together. Each sample is appended after the
+    ones before it, so the replay adds them one by one as the train command would.
+    """
+
+    COMPACT_EVERY = int(getenv("JOURNAL_COMPACT_EVERY", "50"))
+    # * The kinds of failures counted in the template areas
+    FAILED = ("area", "center", "both", "unexistent")
+
+    @classmethod
+    def file(cls, template_file: str) -> str:
+        """Get the journal of a template, given without the .json extension."""
+
+        return template_journal_file(template_file)
+
+    @classmethod
+    def lock(cls, template_file: str, shared: bool = False) -> ContextManager[None]:
+        """
+        Lock the template and its journal, shared to read them, exclusive to update
+        them. The lock is not reentrant, so it is only taken by the commands.
+        """
+
+        return template_lock(template_file, shared)
+
+    @classmethod
+    def header(cls, digest: str) -> bytes:
+        """Get the first line of the journal of the template with the sha256 given."""
+
+        return dumps({"template": digest}).encode()
+
+    @classmethod
+    def append(cls, template_file: str, digest: str, entry: dict) -> int:
+        """
+        Append an entry to the journal, starting a new one if it is of another template.
+
+        Parameters
+        ----------
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+        digest : str
+            The sha256 of the template JSON.
+        entry : dict
+            The sample or the failures.
+
+        Returns
+        -------
+        int
+            The size of the journal in bytes.
+        """
+
+        journal_file = cls.file(template_file)
+        header = cls.header(digest) + b"\n"
+        line = dumps(
+            entry, ensure_ascii=False, separators=(",", ":"), cls=DecimalEncoder
+        )
+
+        try:
+            with open(journal_file, "a+b") as file:
+                file.seek(0)
+                if file.readline() != header:
+                    file.truncate(0)
+                    file.write(header)
+                else:
+                    # * A line cut by a crash is ended, so it is the only one lost
+                    file.seek(-1, os.SEEK_END)
+                    if file.read(1) != b"\n":
+                        file.write(b"\n")
+                file.write(f"{line}\n".encode())
+                file.flush()
+                os.fsync(file.fileno())
+                return file.tell()
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed writing to JSON {journal_file}.", code=9)
+
+    @classmethod
+    def valid(cls, entry: dict, total_areas: int) -> bool:
+        """
+        Check an entry only refers to areas of the template, so a bad one is skipped
+        instead of failing every read of the template.
+
+        Parameters
+        ----------
+        entry : dict
+            The sample or the failures.
+        total_areas : int
+            The number of areas of the template, their ids go from 0 to it.
+        """
+
+        try:
+            if "sample" in entry:
+                ids = [area["id"] for area in entry["sample"]["areas"]]
+                if sorted(entry["order"]) != sorted(
+                    ["top_left", "top_right", "bottom_right", "bottom_left"]
+                ):
+                    return False
+            else:
+                ids = [area_id for area_id, _ in entry["failed"]]
+                if any(kind not in cls.FAILED for _, kind in entry["failed"]):
+                    return False
+        except (KeyError, TypeError, ValueError):
+            return False
+
+        return all(
+            type(area_id) is int and 0 <= area_id < total_areas for area_id in ids
+        )
+
+    @classmethod
+    def read(cls, template_file: str) -> tuple[BaseData, bytes, int, int]:
+        """
+        Read the template with its journal replayed.
+
+        Parameters
+        ----------
+        template_file : str
+            Path and only name of the template JSON, without the .json extension.
+
+        Returns
+        -------
+        tuple[BaseData, bytes, int, int]
+            The template, the content of its JSON, the number of entries replayed and
+            the size of the journal replayed in bytes, 0 if it is of another template.
+        """
+
+        json_file = f"{template_file}.json"
+        if not os.path.isfile(json_file):
+            # ! ERROR CODE 10
+            Logger.err_exit(f"JSON {json_file} not found.", code=10)
+
+        try:
+            with open(json_file, "rb") as file:
+                content = file.read()
+            template: BaseData = loads(content, object_hook=object_hook_decimal)
+        except Exception as error:
+            Logger.debug(f"{error}")
+            # ! ERROR CODE 11
+            Logger.err_exit(f"Unable to read JSON {json_file}.", code=11)
+
+        template["areas"] = sorted(template["areas"], key=lambda x: x["id"])
+        entries, journal = cls.__replay(
+            template_file, template, sha256(content).hexdigest()
+        )
+
+        return template, content, entries, journal
+
+    @classmethod
+    def compact(cls, template_file: str) -> tuple[BaseData, bytes]:
+        """
+        Replay the journal into the template, write it and remove the journal.
+
+        Returns
+        -------
+        tuple[BaseData, bytes]
+            The template and the content of its JSON.
+        """
+
+        template, _, entries, _ = cls.read(template_file)
+        content = dumps(
+            template, indent=4, ensure_ascii=False, cls=DecimalEncoder
+        ).encode()
+
+        try:
+            atomic_write(f"{template_file}.json", content)
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed writing to JSON {template_file}.json.", code=9)
+
+        # * If this is not reached the journal is of the old template, so it is ignored
+        if os.path.isfile(cls.file(template_file)):
+            os.remove(cls.file(template_file))
+        Logger.info(f"Compacted {entries} journal entries into {template_file}.json.")
+
+        return template, content
+
+    @classmethod
+    def __replay(
+        cls, template_file: str, template: BaseData, digest: str
+    ) -> tuple[int, int]:
+        """
+        Apply the entries of the journal to the template, if it is of the template,
+        returning the number of entries and the size of the journal replayed.
+        """
+
+        journal_file = cls.file(template_file)
+        if not os.path.isfile(journal_file):
+            return 0, 0
+
+        with open(journal_file, "rb") as file:
+            content = file.read()
+        lines = content.splitlines()
+
+        if len(lines) == 0 or lines[0] != cls.header(digest):
+            Logger.debug(f"Ignoring {journal_file}, it is of another template.")
+            return 0, 0
+
+        entries = 0
+        for line in lines[1:]:
+            try:
+                entry = loads(line, object_hook=object_hook_decimal)
+            except ValueError:
+                Logger.warning(f"Skipping a cut line of {journal_file}.")
+                continue
+            if not cls.valid(entry, len(template["areas"])):
+                Logger.warning(f"Skipping an invalid entry of {journal_file}.")
+                continue
+
+            if "sample" in entry:
+                data: NewData = entry["sample"]
+                Train.add_data(data, template, entry["order"])
+            else:
+                for area_id, kind in entry["failed"]:
+                    template["areas"][area_id]["failed"][
+                        cast(Literal["area", "center", "both", "unexistent"], kind)
+                    ] += 1
+            entries += 1
+
+        return entries, len(content)
@@ -0,0 +1,182 @@
+import os
+from contextlib import contextmanager, nullcontext
+from json import dump, dumps, loads
+from statistics import mean, quantiles
+from time import perf_counter, time
+from typing import ContextManager, Iterator, TextIO
+
+from logger import Logger
+
+
+class Timings:
+    """
+    Class to time the named stages of each piece, writing one JSON line per piece and
+    a summary with percentiles. When not configured every stage is a shared null
+    context, so the instrumentation costs a method call.
+    """
+
+    __NULL = nullcontext()
+
+    __file: TextIO | None = None
+    __timings_file: str | None = None
+    __stages: dict[str, float] | None = None
+
+    @classmethod
+    def configure(cls, timings_file: str | None, append: bool = False):
+        """
+        Configure where the timings are written.
+
+        Parameters
+        ----------
+        timings_file : str | None
+            The JSON lines file to write a record per piece to, None to disable the
+            timings.
+        append : bool
+            If the file is kept instead of started over, for the workers writing to the
+            file of the main process.
+        """
+
+        cls.__timings_file = timings_file
+        if timings_file is None:
+            return
+
+        try:
+            # * Only emptied once, every process appends so no line is overwritten
+            if not append:
+                open(timings_file, "w").close()
+            cls.__file = open(timings_file, "a")
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed writing to {timings_file}.", code=9)
+
+        Logger.debug(f"Timings: to {timings_file}.")
+
+    @classmethod
+    def file(cls) -> str | None:
+        """Get the file the timings are written to, None if disabled."""
+
+        return cls.__timings_file
+
+    @classmethod
+    @contextmanager
+    def piece(cls, piece: str) -> Iterator[None]:
+        """
+        Time the stages of a piece, writing its record when done. Pieces inside a piece
+        are part of the outer one.
+        """
+
+        if cls.__file is None or cls.__stages is not None:
+            yield
+            return
+
+        cls.__stages = {}
+        started = time()
+        start = perf_counter()
+        code = 0
+        try:
+            yield
+        except SystemExit as error:
+            code = error.code if isinstance(error.code, int) else 1
+            raise
+        finally:
+            record = {
+                "piece": piece,
+                "started": round(started, 3),
+                "code": code,
+                "total_ms": round((perf_counter() - start) * 1000, 3),
+                "stages": {
+                    stage: round(seconds * 1000, 3)
+                    for stage, seconds in cls.__stages.items()
+                },
+            }
+            cls.__stages = None
+            # * A single write per line, so workers can append to the same file
+            cls.__file.write(dumps(record) + "\n")
+            cls.__file.flush()
+
+    @classmethod
+    def stage(cls, stage: str) -> ContextManager:
+        """Time a stage of the current piece, adding up repeated stages."""
+
+        if cls.__stages is None:
+            return cls.__NULL
+        return cls.__time(stage)
+
+    @classmethod
+    @contextmanager
+    def __time(cls, stage: str) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            if cls.__stages is not None:
+                cls.__stages[stage] = (
+                    cls.__stages.get(stage, 0.0) + perf_counter() - start
+                )
+
+    @classmethod
+    def close(cls):
+        """Close the timings file, without summarising it."""
+
+        if cls.__file is not None:
+            cls.__file.close()
+            cls.__file = None
+
+    @classmethod
+    def flush(cls):
+        """
+        Close the timings file and write the summary of every record in it to
+        `<timings>_summary.json`, with the count, mean, p50, p95, p99 and max of each
+        stage in milliseconds.
+        """
+
+        if cls.__file is None or cls.__timings_file is None:
+            return
+
+        cls.close()
+
+        samples: dict[str, list[float]] = {}
+        try:
+            with open(cls.__timings_file, "r") as file:
+                for line in file:
+                    record = loads(line)
+                    samples.setdefault("total", []).append(record["total_ms"])
+                    for stage, ms in record["stages"].items():
+                        samples.setdefault(stage, []).append(ms)
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 11
+            Logger.err_exit(f"Unable to read JSON {cls.__timings_file}.", code=11)
+
+        summary: dict[str, dict[str, float]] = {}
+        for stage, values in samples.items():
+            # * Inclusive quantiles stay within the samples for few pieces
+            cuts = (
+                quantiles(values, n=100, method="inclusive")
+                if len(values) > 1
+                else values * 99
+            )
+            summary[stage] = {
+                "count": len(values),
+                "mean_ms": round(mean(values), 3),
+                "p50_ms": round(cuts[49], 3),
+                "p95_ms": round(cuts[94], 3),
+                "p99_ms": round(cuts[98], 3),
+                "max_ms": round(max(values), 3),
+            }
+            Logger.info(
+                f"{stage}: {len(values)} pieces, mean {summary[stage]['mean_ms']} ms, "
+                + f"p50 {summary[stage]['p50_ms']} ms, "
+                + f"p95 {summary[stage]['p95_ms']} ms, "
+                + f"max {summary[stage]['max_ms']} ms."
+            )
+
+        summary_file = f"{os.path.splitext(cls.__timings_file)[0]}_summary.json"
+        try:
+            with open(summary_file, "w") as file:
+                dump(summary, file, indent=4, ensure_ascii=False)
+        except Exception as error:
+            Logger.debug(f"Exception: {error}")
+            # ! ERROR CODE 9
+            Logger.err_exit(f"Failed writing to JSON {summary_file}", code=9)
@@ -1,9 +1,11 @@
+import os
+from contextlib import contextmanager
 from copy import deepcopy
 from decimal import Decimal
 from json import JSONEncoder
 from math import acos, sin
 from re import match
-from typing import Dict, Literal, TypeVar, cast
+from typing import ContextManager, Dict, Iterator, Literal, TypeVar, cast
 
 from self_types import Area, BaseArea
 
@@ -26,8 +28,9 @@ def object_hook_decimal(data: Dict):
     for key, value in data.items():
         new_value = value
         if type(value) is str:
-            if match(r"^[-\+]?\d*(\.\d*)?$", value):
-                if "-" in value:
+            # * Decimal writes small numbers, like a zero variance, with an exponent
+            if match(r"^[-\+]?(\d+(\.\d*)?|\.\d+)([eE][-\+]?\d+)?$", value):
+                if value.startswith("-"):
                     raise ValueError("Negative numbers are not allowed")
                 new_value = Decimal(value)
         data[key] = new_value
@@ -493,3 +496,73 @@ def herons_formula(
     ).sqrt()
 
     return distance_top_left_px_x, distance_top_left_px_y
+
+
+def atomic_write(file_name: str, content: str | bytes):
+    """
+    Write a file through a temporary file renamed over it, so a reader or a crash
+    never sees it half written.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the file.
+    content : str | bytes
+        The content of the file.
+    """
+
+    temporary = f"{file_name}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb" if isinstance(content, bytes) else "w") as file:
+            file.write(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, file_name)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+@contextmanager
+def file_lock(file_name: str, shared: bool = False) -> Iterator[None]:
+    """
+    Hold an advisory lock on a file, created if missing, so the processes sharing
+    what it guards take turns. It is released if the process dies.
+
+    Parameters
+    ----------
+    file_name : str
+        The path of the lock file.
+    shared : bool
+        Take a shared lock, held by many readers at once, instead of an exclusive one.
+    """
+
+    try:
+        from fcntl import LOCK_EX, LOCK_SH, LOCK_UN, flock
+    except ImportError:
+        # * Without fcntl, like on Windows, nothing is locked and a single process is
+        # * expected to use what the lock guards
+        yield
+        return
+
+    with open(file_name, "a") as file:
+        flock(file.fileno(), LOCK_SH if shared else LOCK_EX)
+        try:
+            yield
+        finally:
+            flock(file.fileno(), LOCK_UN)
+
+
+def template_journal_file(template_file: str) -> str:
+    """Get the journal of a template, given without the .json extension."""
+
+    return f"{template_file}_journal.jsonl"
+
+
+def template_lock(template_file: str, shared: bool = False) -> ContextManager[None]:
+    """
+    Lock a template, given without the .json extension, and its journal, shared to
+    read them, exclusive to update them. The lock is not reentrant.
+    """
+
+    return file_lock(f"{template_file}.lock", shared)